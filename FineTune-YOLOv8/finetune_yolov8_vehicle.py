@@ -1,23 +1,41 @@
+import sys
+
 from ultralytics import YOLO
 from PIL import Image
 
-model = YOLO('yolov8m.pt')
-
-dataset_config = './vehicle.yaml'
 
-model.train(
-    data=dataset_config,
-    epochs=100,          # cukup untuk fine-tuning, bisa ditambah jika perlu
-    imgsz=512,           # 640 adalah kompromi bagus antara akurasi dan kecepatan
-    batch=8,            # Tesla T4 biasanya cukup kuat untuk batch 16, kalau VRAM 16GB masih aman
+def finetune(
+    base_model='yolov8m.pt',
+    dataset_config='./vehicle.yaml',
+    imgsz=512,
+    epochs=100,
+    batch=8,
     device='cuda',
-    lr0=0.001,           # learning rate awal, aman untuk fine-tuning
-    lrf=0.1,
-    optimizer='SGD',
-    workers=4,           # Google Colab kadang worker lebih dari 2 malah kurang stabil
-    augment=True,
-    val=True
-)
+    name=None,
+):
+    model = YOLO(base_model)
+
+    model.train(
+        data=dataset_config,
+        epochs=epochs,       # cukup untuk fine-tuning, bisa ditambah jika perlu
+        imgsz=imgsz,         # 640 adalah kompromi bagus antara akurasi dan kecepatan
+        batch=batch,         # Tesla T4 biasanya cukup kuat untuk batch 16, kalau VRAM 16GB masih aman
+        device=device,
+        lr0=0.001,           # learning rate awal, aman untuk fine-tuning
+        lrf=0.1,
+        optimizer='SGD',
+        workers=4,           # Google Colab kadang worker lebih dari 2 malah kurang stabil
+        augment=True,
+        val=True,
+        name=name,
+    )
+
+    model.val()
+    # Path best.pt hasil training (dipakai sweep_model_variants.py)
+    return str(model.trainer.best)
 
 
-model.val()
\ No newline at end of file
+if __name__ == '__main__':
+    # Bisa diganti, mis. vehicle.yaml hasil hard-example mining dari server
+    dataset_config = sys.argv[1] if len(sys.argv) > 1 else './vehicle.yaml'
+    finetune(dataset_config=dataset_config)
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image
+from ultralytics import YOLO
+
+from finetune_yolov8_vehicle import finetune
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+PRECISIONS = ('fp32', 'int8')
+
+
+def parse_list(value, cast=str):
+    return [cast(item.strip()) for item in value.split(',') if item.strip()]
+
+
+def write_calibration_yaml(images_dir, out_dir):
+    # Kalibrasi INT8 memakai split "val"; arahkan ke sampel foto parkiran.
+    path = Path(out_dir) / 'calibration.yaml'
+    path.write_text(
+        f'path: {Path(images_dir).resolve()}\n'
+        'train: .\n'
+        'val: .\n'
+        '\n'
+        'nc: 1\n'
+        'names: ["car"]\n'
+    )
+    return str(path)
+
+
+def load_latency_images(images_dir, limit):
+    paths = sorted(p for p in Path(images_dir).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return [Image.open(p).convert('RGB') for p in paths[:limit]]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def export_variant(weights, imgsz, precision, calibration_yaml):
+    if precision == 'fp32':
+        return weights  # PyTorch FP32 apa adanya, sama seperti server saat ini
+    model = YOLO(weights)
+    # OpenVINO + NNCF post-training quantization, dikalibrasi dengan foto parkiran.
+    # dynamic=True: tanpa itu batch terkunci 1, padahal tiled inference dan
+    # rescore_frames.py mengirim beberapa gambar sekaligus.
+    exported = Path(
+        model.export(format='openvino', imgsz=imgsz, int8=True, dynamic=True, data=calibration_yaml)
+    )
+    # Nama export default sama untuk semua imgsz, jadi simpan per imgsz
+    target = exported.with_name(f'{Path(weights).stem}_{imgsz}_int8_openvino_model')
+    if target.exists():
+        shutil.rmtree(target)
+    shutil.move(str(exported), str(target))
+    return str(target)
+
+
+def benchmark_variant(model_path, data, imgsz, images, warmup, repeats):
+    model = YOLO(model_path, task='detect')
+    metrics = model.val(data=data, imgsz=imgsz, batch=1, device='cpu', plots=False, verbose=False)
+
+    for img in images[:warmup]:
+        model(img, imgsz=imgsz, device='cpu', verbose=False)
+    latencies = []
+    for _ in range(repeats):
+        for img in images:
+            start = time.perf_counter()
+            model(img, imgsz=imgsz, device='cpu', verbose=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'map50': float(metrics.box.map50),
+        'map50_95': float(metrics.box.map),
+        'latency_ms_mean': statistics.mean(latencies),
+        'latency_ms_p50': percentile(latencies, 50),
+        'latency_ms_p99': percentile(latencies, 99),
+    }
+
+
+def rank_variants(results, metric, accuracy_bar):
+    # Yang lolos accuracy bar diurutkan dari yang paling cepat (p50, lalu p99);
+    # sisanya di bawah, diurutkan dari akurasi tertinggi.
+    passing = [r for r in results if r[metric] >= accuracy_bar]
+    failing = [r for r in results if r[metric] < accuracy_bar]
+    passing.sort(key=lambda r: (r['latency_ms_p50'], r['latency_ms_p99']))
+    failing.sort(key=lambda r: r[metric], reverse=True)
+    ranked = []
+    for rank, r in enumerate(passing + failing, start=1):
+        ranked.append({**r, 'rank': rank, 'meets_accuracy_bar': r[metric] >= accuracy_bar})
+    return ranked
+
+
+def write_report(ranked, out_dir, metric, accuracy_bar):
+    out_dir = Path(out_dir)
+    (out_dir / 'sweep_report.json').write_text(json.dumps(ranked, indent=2))
+
+    lines = [
+        f'# Model variant sweep (accuracy bar: {metric} >= {accuracy_bar})',
+        '',
+        '| rank | size | imgsz | precision | mAP50 | mAP50-95 | p50 ms | p99 ms | lolos |',
+        '|---|---|---|---|---|---|---|---|---|',
+    ]
+    for r in ranked:
+        lines.append(
+            f"| {r['rank']} | {r['size']} | {r['imgsz']} | {r['precision']} "
+            f"| {r['map50']:.3f} | {r['map50_95']:.3f} "
+            f"| {r['latency_ms_p50']:.1f} | {r['latency_ms_p99']:.1f} "
+            f"| {'ya' if r['meets_accuracy_bar'] else 'tidak'} |"
+        )
+    best = next((r for r in ranked if r['meets_accuracy_bar']), None)
+    if best:
+        lines += [
+            '',
+            'Konfigurasi server untuk varian terbaik:',
+            '',
+            f"    NEOPARK_MODEL_PATH={best['model_path']}",
+            f"    NEOPARK_MODEL_IMGSZ={best['imgsz']}",
+            '',
+            'Varian int8 diekspor dengan batch dinamis, jadi aman dipakai untuk',
+            'tiled inference (NEOPARK_TILE_BATCH_SIZE) dan rescore_frames.py (--batch-size).',
+            'Jangan serve export OpenVINO lain yang dibuat tanpa dynamic=True: batch-nya terkunci 1.',
+        ]
+    (out_dir / 'sweep_report.md').write_text('\n'.join(lines) + '\n')
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep ukuran/imgsz/presisi model YOLO untuk CPU server.')
+    parser.add_argument('--data', default='./vehicle.yaml', help='Dataset untuk training dan mAP validasi')
+    parser.add_argument('--sizes', default='n,s,m')
+    parser.add_argument('--imgsz', default='320,416,512', help='Ukuran input inference yang diuji')
+    parser.add_argument('--train-imgsz', type=int, default=512)
+    parser.add_argument('--precisions', default='fp32,int8')
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--device', default='cuda', help='Device untuk training (benchmark selalu CPU)')
+    parser.add_argument('--weights-dir', help='Pakai <dir>/yolov8<size>.pt yang sudah di-fine-tune, lewati training')
+    parser.add_argument('--calibration-images', required=True, help='Folder sampel foto parkiran untuk kalibrasi INT8')
+    parser.add_argument('--latency-images', help='Folder gambar untuk ukur latency (default: calibration images)')
+    parser.add_argument('--latency-limit', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--metric', default='map50', choices=('map50', 'map50_95'))
+    parser.add_argument('--accuracy-bar', type=float, default=0.85)
+    parser.add_argument('--out', default='sweep_output')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    calibration_yaml = write_calibration_yaml(args.calibration_images, args.out)
+    images = load_latency_images(args.latency_images or args.calibration_images, args.latency_limit)
+    precisions = parse_list(args.precisions)
+    unknown = set(precisions) - set(PRECISIONS)
+    if unknown:
+        parser.error(f'Presisi tidak dikenal: {sorted(unknown)}')
+
+    results = []
+    for size in parse_list(args.sizes):
+        if args.weights_dir:
+            weights = str(Path(args.weights_dir) / f'yolov8{size}.pt')
+        else:
+            # Satu kali fine-tune per ukuran; imgsz inference di-sweep setelahnya
+            weights = finetune(
+                base_model=f'yolov8{size}.pt',
+                dataset_config=args.data,
+                imgsz=args.train_imgsz,
+                epochs=args.epochs,
+                device=args.device,
+                name=f'sweep-yolov8{size}',
+            )
+        for imgsz in parse_list(args.imgsz, int):
+            for precision in precisions:
+                model_path = export_variant(weights, imgsz, precision, calibration_yaml)
+                result = benchmark_variant(model_path, args.data, imgsz, images, args.warmup, args.repeats)
+                result.update({'size': size, 'imgsz': imgsz, 'precision': precision, 'model_path': str(model_path)})
+                print(json.dumps(result))
+                results.append(result)
+
+    ranked = rank_variants(results, args.metric, args.accuracy_bar)
+    best = write_report(ranked, args.out, args.metric, args.accuracy_bar)
+    if best:
+        print(f"Varian termurah yang lolos: yolov8{best['size']} imgsz={best['imgsz']} {best['precision']} -> {best['model_path']}")
+    else:
+        print('Tidak ada varian yang memenuhi accuracy bar.')
+
+
+if __name__ == '__main__':
+    main()
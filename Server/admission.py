@@ -0,0 +1,162 @@
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+admission_queue_depth = Gauge(
+    "neopark_admission_queue_depth",
+    "Number of uploads waiting for an inference slot",
+)
+admission_in_flight = Gauge(
+    "neopark_admission_in_flight",
+    "Number of uploads currently running inference",
+)
+admission_admitted_total = Counter(
+    "neopark_admission_admitted_total",
+    "Total number of uploads admitted to inference",
+    ["area"],
+)
+admission_rejected_total = Counter(
+    "neopark_admission_rejected_total",
+    "Total number of uploads rejected by admission control",
+    ["area", "reason"],
+)
+admission_service_share = Gauge(
+    "neopark_admission_service_share",
+    "Fraction of admitted uploads served for each area",
+    ["area"],
+)
+admission_wait_seconds = Histogram(
+    "neopark_admission_wait_seconds",
+    "Time uploads spend queued before inference",
+    ["area"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0),
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, area_id, reason, retry_after):
+        super().__init__(f"Upload for Area {area_id} rejected: {reason}")
+        self.area_id = area_id
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    # Membatasi inference paralel; antrean diurutkan per prioritas lalu
+    # weighted fair queueing (start-time fair queueing) antar area.
+    def __init__(
+        self,
+        capacity=4,
+        max_queue=32,
+        weights=None,
+        priorities=None,
+        deadline_seconds=5.0,
+        default_weight=1.0,
+        default_priority=1,
+    ):
+        self.weights = dict(weights or {})
+        for area_id, weight in {**self.weights, "default": default_weight}.items():
+            # Tag SFQ memakai 1 / bobot; bobot 0 atau negatif tidak bermakna.
+            if not weight > 0:
+                raise ValueError(f"Weight for area {area_id} must be positive")
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.priorities = dict(priorities or {})
+        self.deadline_seconds = deadline_seconds
+        self.default_weight = default_weight
+        self.default_priority = default_priority
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = []
+        self._evicted = set()
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._service_time = 0.5
+        self.admitted = {}
+
+    def _tag(self, area_id):
+        # Tag start/finish SFQ: area berbobot besar mendapat jatah lebih banyak.
+        weight = self.weights.get(area_id, self.default_weight)
+        start = max(self._virtual_time, self._last_finish.get(area_id, 0.0))
+        self._last_finish[area_id] = start + 1.0 / weight
+        return start
+
+    def retry_after(self):
+        queued_rounds = (len(self._waiting) + 1) / max(1, self.capacity)
+        return max(1, math.ceil(queued_rounds * self._service_time))
+
+    def _reject(self, area_id, reason):
+        admission_rejected_total.labels(area=area_id, reason=reason).inc()
+        raise AdmissionRejected(area_id, reason, self.retry_after())
+
+    def _dispatch(self, area_id, start_tag, arrived):
+        self._active += 1
+        self._virtual_time = max(self._virtual_time, start_tag)
+        self.admitted[area_id] = self.admitted.get(area_id, 0) + 1
+        total = sum(self.admitted.values())
+        for admitted_area, count in self.admitted.items():
+            admission_service_share.labels(area=admitted_area).set(count / total)
+        admission_admitted_total.labels(area=area_id).inc()
+        admission_wait_seconds.labels(area=area_id).observe(time.monotonic() - arrived)
+        admission_in_flight.set(self._active)
+
+    def _acquire(self, area_id, arrived):
+        deadline = arrived + self.deadline_seconds
+        with self._cond:
+            if self._active < self.capacity and not self._waiting:
+                self._dispatch(area_id, self._tag(area_id), arrived)
+                return
+            priority = self.priorities.get(area_id, self.default_priority)
+            if len(self._waiting) >= self.max_queue:
+                # Antrean penuh: upload berprioritas lebih tinggi menggantikan
+                # tiket terburuk (prioritas terendah, lalu tag start terakhir).
+                worst = max(self._waiting, default=None)
+                if worst is None or priority >= worst[0]:
+                    self._reject(area_id, "queue_full")
+                self._waiting.remove(worst)
+                self._evicted.add(worst)
+                self._cond.notify_all()
+            start_tag = self._tag(area_id)
+            ticket = (priority, start_tag, next(self._sequence))
+            self._waiting.append(ticket)
+            admission_queue_depth.set(len(self._waiting))
+            try:
+                while ticket in self._evicted or not (
+                    self._active < self.capacity and min(self._waiting) == ticket
+                ):
+                    if ticket in self._evicted:
+                        self._evicted.discard(ticket)
+                        self._reject(area_id, "queue_full")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        # Frame sudah terlalu lama; frame berikutnya lebih berguna.
+                        self._reject(area_id, "deadline")
+                    self._cond.wait(remaining)
+            finally:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                admission_queue_depth.set(len(self._waiting))
+                self._cond.notify_all()
+            self._dispatch(area_id, start_tag, arrived)
+
+    def _release(self, service_time):
+        with self._cond:
+            self._active -= 1
+            self._service_time = 0.8 * self._service_time + 0.2 * service_time
+            admission_in_flight.set(self._active)
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, area_id, arrived=None):
+        arrived = time.monotonic() if arrived is None else arrived
+        self._acquire(area_id, arrived)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
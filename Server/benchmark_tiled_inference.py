@@ -0,0 +1,140 @@
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image
+from ultralytics import YOLO
+
+from detection import (
+    CONFIDENCE_THRESHOLD,
+    box_overlap,
+    extract_car_candidates,
+    run_tiled_inference,
+)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+
+
+def load_yolo_labels(label_path, width, height, car_class_id=0):
+    # Format YOLO: class cx cy w h (ternormalisasi).
+    boxes = []
+    if not label_path.exists():
+        return boxes
+    for line in label_path.read_text().splitlines():
+        parts = line.split()
+        if len(parts) != 5 or int(parts[0]) != car_class_id:
+            continue
+        cx, cy, w, h = (float(v) for v in parts[1:])
+        boxes.append(
+            [
+                (cx - w / 2) * width,
+                (cy - h / 2) * height,
+                (cx + w / 2) * width,
+                (cy + h / 2) * height,
+            ]
+        )
+    return boxes
+
+
+def match_detections(detections, ground_truth, iou_threshold=0.5):
+    matched = set()
+    true_positives = 0
+    for det in sorted(detections, key=lambda d: d["confidence"], reverse=True):
+        best_index, best_iou = None, iou_threshold
+        for index, gt_box in enumerate(ground_truth):
+            if index in matched:
+                continue
+            iou = box_overlap(det["bounding_box"], gt_box)
+            if iou >= best_iou:
+                best_index, best_iou = index, iou
+        if best_index is not None:
+            matched.add(best_index)
+            true_positives += 1
+    return true_positives
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def benchmark_mode(name, infer, samples, iou_threshold):
+    latencies = []
+    true_positives = predicted = ground_truth_total = 0
+    for img, ground_truth in samples:
+        start = time.perf_counter()
+        candidates = infer(img)
+        latencies.append((time.perf_counter() - start) * 1000)
+        detections = [c for c in candidates if c["confidence"] > CONFIDENCE_THRESHOLD]
+        true_positives += match_detections(detections, ground_truth, iou_threshold)
+        predicted += len(detections)
+        ground_truth_total += len(ground_truth)
+    return {
+        "mode": name,
+        "frames": len(samples),
+        "latency_ms_mean": statistics.mean(latencies),
+        "latency_ms_p50": percentile(latencies, 50),
+        "latency_ms_p99": percentile(latencies, 99),
+        "recall": true_positives / ground_truth_total if ground_truth_total else None,
+        "precision": true_positives / predicted if predicted else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bandingkan latency dan recall full-frame vs tiled inference."
+    )
+    parser.add_argument("--model", default="fine-best.pt")
+    parser.add_argument("--images", required=True, help="Folder gambar frame kamera")
+    parser.add_argument("--labels", help="Folder label YOLO (default: ../labels)")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--no-full-frame", action="store_true")
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--warmup", type=int, default=2)
+    args = parser.parse_args()
+
+    images_dir = Path(args.images)
+    labels_dir = Path(args.labels) if args.labels else images_dir.parent / "labels"
+    samples = []
+    for image_path in sorted(images_dir.iterdir()):
+        if image_path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        img = Image.open(image_path).convert("RGB")
+        label_path = labels_dir / f"{image_path.stem}.txt"
+        samples.append((img, load_yolo_labels(label_path, *img.size)))
+    if not samples:
+        parser.error(f"Tidak ada gambar di {images_dir}")
+
+    model = YOLO(args.model)
+
+    def full_frame(img):
+        return extract_car_candidates(model(img, verbose=False), model.names)
+
+    def tiled(img):
+        return run_tiled_inference(
+            model,
+            img,
+            tile_size=args.tile_size,
+            overlap=args.overlap,
+            batch_size=args.batch_size,
+            include_full_frame=not args.no_full_frame,
+        )
+
+    for img, _ in samples[: args.warmup]:
+        full_frame(img)
+        tiled(img)
+
+    report = [
+        benchmark_mode("full_frame", full_frame, samples, args.iou),
+        benchmark_mode("tiled", tiled, samples, args.iou),
+    ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
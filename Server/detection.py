@@ -0,0 +1,165 @@
+CONFIDENCE_THRESHOLD = 0.8
+TARGET_CLASS = "car"
+# Box sedekat ini (px) ke tepi tile dianggap terpotong oleh tile.
+TILE_BORDER_MARGIN = 2
+
+
+def extract_car_candidates(results, names, offset=(0, 0)):
+    # Semua box "car" dari hasil YOLO, termasuk yang di bawah threshold.
+    offset_x, offset_y = offset
+    candidates = []
+    for result in results:
+        boxes = result.boxes
+        if boxes is None:
+            continue
+        for box in boxes:
+            class_name = names[int(box.cls[0])]
+            if class_name != TARGET_CLASS:
+                continue
+            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
+            candidates.append(
+                {
+                    "class": class_name,
+                    "confidence": float(box.conf[0]),
+                    "bounding_box": [
+                        x1 + offset_x,
+                        y1 + offset_y,
+                        x2 + offset_x,
+                        y2 + offset_y,
+                    ],
+                }
+            )
+    return candidates
+
+
+def confident_car_detections(candidates, area_id, threshold=CONFIDENCE_THRESHOLD):
+    # Bentuk deteksi yang disimpan server di latest_detection.
+    return [
+        {
+            "class": candidate["class"],
+            "confidence": candidate["confidence"],
+            "bounding_box": candidate["bounding_box"],
+            "area": area_id,
+        }
+        for candidate in candidates
+        if candidate["confidence"] > threshold
+    ]
+
+
+def validate_tile_settings(tile_size, overlap, batch_size):
+    # Dipanggil saat startup: overlap >= 1 membuat stride tile tidak maju.
+    if tile_size <= 0:
+        raise ValueError(f"tile_size must be positive, got {tile_size}")
+    if not 0 <= overlap < 1:
+        raise ValueError(f"tile overlap must be in [0, 1), got {overlap}")
+    if batch_size <= 0:
+        raise ValueError(f"tile batch_size must be positive, got {batch_size}")
+
+
+def tile_windows(width, height, tile_size, overlap):
+    # Jendela (x1, y1, x2, y2) yang saling overlap dan menutup seluruh frame.
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size + 1, stride))
+        if positions[-1] != length - tile_size:
+            positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def _box_area(box):
+    return max(0, box[2] - box[0]) * max(0, box[3] - box[1])
+
+
+def box_overlap(box_a, box_b, metric="iou"):
+    ix1 = max(box_a[0], box_b[0])
+    iy1 = max(box_a[1], box_b[1])
+    ix2 = min(box_a[2], box_b[2])
+    iy2 = min(box_a[3], box_b[3])
+    intersection = _box_area((ix1, iy1, ix2, iy2))
+    if intersection == 0:
+        return 0.0
+    area_a = _box_area(box_a)
+    area_b = _box_area(box_b)
+    if metric == "ios":
+        # Intersection over smaller: menangkap potongan mobil di tepi tile.
+        return intersection / min(area_a, area_b)
+    return intersection / (area_a + area_b - intersection)
+
+
+def non_max_suppression(detections, threshold=0.5, metric="iou", overlap=None):
+    if overlap is None:
+
+        def overlap(a, b):
+            return box_overlap(a["bounding_box"], b["bounding_box"], metric)
+
+    kept = []
+    for det in sorted(detections, key=lambda d: d["confidence"], reverse=True):
+        if all(overlap(det, k) <= threshold for k in kept):
+            kept.append(det)
+    return kept
+
+
+def _touches_tile_border(box, window, width, height, margin=TILE_BORDER_MARGIN):
+    # Hanya tepi tile yang berada di dalam frame; tepi frame bukan potongan.
+    x1, y1, x2, y2 = window
+    return (
+        (x1 > 0 and box[0] - x1 <= margin)
+        or (y1 > 0 and box[1] - y1 <= margin)
+        or (x2 < width and x2 - box[2] <= margin)
+        or (y2 < height and y2 - box[3] <= margin)
+    )
+
+
+def _tile_overlap(a, b):
+    # IoS hanya untuk potongan mobil di tepi tile vs deteksi dari crop lain;
+    # mobil yang berdempetan di crop yang sama tetap dibandingkan dengan IoU.
+    if a["_source"] != b["_source"] and (a["_at_border"] or b["_at_border"]):
+        return box_overlap(a["bounding_box"], b["bounding_box"], "ios")
+    return box_overlap(a["bounding_box"], b["bounding_box"], "iou")
+
+
+def run_tiled_inference(
+    model,
+    img,
+    tile_size=640,
+    overlap=0.2,
+    batch_size=8,
+    include_full_frame=True,
+    nms_threshold=0.6,
+    predict_kwargs=None,
+):
+    width, height = img.size
+    windows = tile_windows(width, height, tile_size, overlap)
+    crops = [img.crop(window) for window in windows]
+    if include_full_frame and len(windows) > 1:
+        # Mobil besar dekat kamera bisa lebih lebar dari satu tile.
+        crops.append(img)
+        windows.append((0, 0, width, height))
+
+    candidates = []
+    for start in range(0, len(crops), batch_size):
+        batch_results = model(
+            crops[start : start + batch_size], **(predict_kwargs or {})
+        )
+        for source, result in enumerate(batch_results, start=start):
+            window = windows[source]
+            for candidate in extract_car_candidates([result], model.names, window[:2]):
+                candidate["_source"] = source
+                candidate["_at_border"] = _touches_tile_border(
+                    candidate["bounding_box"], window, width, height
+                )
+                candidates.append(candidate)
+    kept = non_max_suppression(candidates, nms_threshold, overlap=_tile_overlap)
+    return [
+        {key: value for key, value in det.items() if not key.startswith("_")}
+        for det in kept
+    ]
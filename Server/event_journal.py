@@ -0,0 +1,283 @@
+import bisect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+FILE_PREFIX = "events-"
+FILE_SUFFIX = ".ndjson"
+
+journal_events_total = Counter(
+    "neopark_journal_events_total",
+    "Total number of occupancy change events written to the journal",
+    ["type"],
+)
+journal_last_seq = Gauge(
+    "neopark_journal_last_seq",
+    "Sequence number of the last event flushed to the journal",
+)
+
+
+class EventJournal:
+    # Journal append-only berisi event NDJSON dengan nomor urut monoton.
+    # File dirotasi per ukuran; nama file = seq pertama di dalamnya.
+    def __init__(
+        self,
+        directory,
+        max_file_bytes=16 * 1024 * 1024,
+        max_files=20,
+        batch_size=256,
+        flush_interval=0.2,
+    ):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._seq_lock = threading.Lock()
+        self._flushed = threading.Condition()
+        self._queue = queue.Queue()
+        self._file = None
+        self._writer_thread = None
+        self._stop_event = threading.Event()
+        self.flushed_seq = self._recover_last_seq()
+        self._next_seq = self.flushed_seq + 1
+        journal_last_seq.set(self.flushed_seq)
+
+    # --- File ---
+
+    def _file_path(self, first_seq):
+        return os.path.join(
+            self.directory, f"{FILE_PREFIX}{first_seq:020d}{FILE_SUFFIX}"
+        )
+
+    def file_first_seqs(self):
+        return sorted(
+            int(name[len(FILE_PREFIX) : -len(FILE_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)
+        )
+
+    @staticmethod
+    def _decode(line):
+        # None untuk baris terpotong (tanpa newline) atau rusak.
+        if not line.endswith(b"\n"):
+            return None
+        try:
+            event = json.loads(line)
+            int(event["seq"])
+            return event
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _recover_last_seq(self):
+        # Setelah crash, ekor file terbaru bisa berisi baris terpotong: buang
+        # ekor yang rusak, hapus file tanpa satu pun baris utuh, lalu lanjutkan
+        # dari seq valid terakhir. File lama tidak pernah ditulis ulang.
+        for first_seq in reversed(self.file_first_seqs()):
+            path = self._file_path(first_seq)
+            last_seq, valid_bytes = None, 0
+            with open(path, "rb") as f:
+                for line in f:
+                    event = self._decode(line)
+                    if event is None:
+                        break
+                    last_seq, valid_bytes = event["seq"], valid_bytes + len(line)
+            if last_seq is None:
+                logger.warning(f"Removing event journal file without events: {path}")
+                os.remove(path)
+                continue
+            if valid_bytes < os.path.getsize(path):
+                logger.warning(f"Truncating torn tail of event journal file: {path}")
+                os.truncate(path, valid_bytes)
+            return last_seq
+        return 0
+
+    # --- Penulisan ---
+
+    def start(self):
+        if self._writer_thread is None:
+            self._writer_thread = threading.Thread(
+                target=self._writer_loop, name="event-journal-writer", daemon=True
+            )
+            self._writer_thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        if self._writer_thread is not None:
+            self._writer_thread.join(timeout)
+            self._writer_thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def emit(self, event_type, **fields):
+        # Seq dibagikan di bawah lock dan diantrekan berurutan, jadi urutan di
+        # file selalu sama dengan urutan seq.
+        with self._seq_lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._queue.put(
+                {"seq": seq, "ts": time.time(), "type": event_type, **fields}
+            )
+        return seq
+
+    def _writer_loop(self):
+        while not self._stop_event.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                logger.error(f"Event journal write failed: {e}")
+
+    def write_batch(self, events):
+        if self._file is None or self._file.tell() >= self.max_file_bytes:
+            self._rotate(events[0]["seq"])
+        self._file.write(
+            "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events)
+        )
+        self._file.flush()
+        for event in events:
+            journal_events_total.labels(type=event["type"]).inc()
+        with self._flushed:
+            self.flushed_seq = events[-1]["seq"]
+            journal_last_seq.set(self.flushed_seq)
+            self._flushed.notify_all()
+
+    def _rotate(self, first_seq):
+        if self._file is not None:
+            self._file.close()
+        # "x": file journal yang sudah ada tidak pernah dibuka untuk append.
+        self._file = open(self._file_path(first_seq), "x")
+        first_seqs = self.file_first_seqs()
+        for old_first_seq in first_seqs[: max(0, len(first_seqs) - self.max_files)]:
+            os.remove(self._file_path(old_first_seq))
+
+    # --- Pembacaan ---
+
+    def wait_for(self, after_seq, timeout):
+        with self._flushed:
+            self._flushed.wait_for(lambda: self.flushed_seq > after_seq, timeout)
+            return self.flushed_seq
+
+    def read_after(self, after_seq):
+        # Semua event dengan seq > after_seq yang sudah di-flush, berurutan.
+        upper = self.flushed_seq
+        if after_seq >= upper:
+            return
+        first_seqs = self.file_first_seqs()
+        start = max(0, bisect.bisect_right(first_seqs, after_seq + 1) - 1)
+        for first_seq in first_seqs[start:]:
+            if first_seq > upper:
+                return
+            try:
+                f = open(self._file_path(first_seq), "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                for line in f:
+                    event = self._decode(line)
+                    if event is None:
+                        break
+                    if event["seq"] > upper:
+                        return
+                    if event["seq"] > after_seq:
+                        yield event
+
+    def follow(
+        self, after_seq, poll_timeout=1.0, stop_event=None, heartbeat_interval=None
+    ):
+        # Tail tanpa henti: event lama dulu, lalu event baru begitu di-flush.
+        # Dengan heartbeat_interval, None di-yield setelah idle selama itu agar
+        # pemanggil menulis sesuatu dan klien yang sudah putus terdeteksi.
+        idle_since = time.monotonic()
+        tail = _JournalTail(self, after_seq)
+        try:
+            while stop_event is None or not stop_event.is_set():
+                for event in tail.read():
+                    idle_since = time.monotonic()
+                    yield event
+                if (
+                    heartbeat_interval is not None
+                    and time.monotonic() - idle_since >= heartbeat_interval
+                ):
+                    idle_since = time.monotonic()
+                    yield None
+                self.wait_for(tail.after_seq, poll_timeout)
+        finally:
+            tail.close()
+
+
+class _JournalTail:
+    # Posisi follower: handle file yang sedang dibaca dan offset setelah baris
+    # utuh terakhir. Hanya pembukaan pertama yang memindai file dari awal;
+    # putaran berikutnya membaca byte yang ditambahkan setelah offset saja.
+    def __init__(self, journal, after_seq):
+        self.journal = journal
+        self.after_seq = after_seq
+        self.first_seq = None
+        self._file = None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self, first_seq):
+        try:
+            self._file = open(self.journal._file_path(first_seq), "rb")
+        except FileNotFoundError:
+            return False  # Dihapus retensi; dicari ulang di putaran berikutnya.
+        self.first_seq = first_seq
+        return True
+
+    def read(self):
+        first_seqs = self.journal.file_first_seqs()
+        if self._file is None:
+            if not first_seqs:
+                return
+            index = bisect.bisect_right(first_seqs, self.after_seq + 1) - 1
+            if not self._open(first_seqs[max(0, index)]):
+                return
+        while True:
+            # Jika sudah ada file yang lebih baru, penulis sudah menutup file ini
+            # dan semua isinya sudah di-flush: baca sampai habis lalu pindah.
+            newer = [seq for seq in first_seqs if seq > self.first_seq]
+            reached_end = yield from self._read_lines()
+            if not (newer and reached_end):
+                return
+            self.close()
+            if not self._open(newer[0]):
+                return
+            first_seqs = self.journal.file_first_seqs()
+
+    def _read_lines(self):
+        # Mengembalikan True jika berhenti di akhir file.
+        while True:
+            offset = self._file.tell()
+            line = self._file.readline()
+            if not line:
+                return True
+            event = EventJournal._decode(line)
+            if event is None or event["seq"] > self.journal.flushed_seq:
+                # Baris belum utuh atau belum di-flush: ulangi dari offset ini.
+                self._file.seek(offset)
+                return False
+            if event["seq"] > self.after_seq:
+                self.after_seq = event["seq"]
+                yield event
@@ -0,0 +1,337 @@
+import bisect
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# Satu record index: timestamp, offset di file .dat, panjang JPEG, panjang JSON.
+INDEX_RECORD = struct.Struct("<dQII")
+
+archive_frames_written_total = Counter(
+    "neopark_archive_frames_written_total",
+    "Total number of frames written to the frame archive",
+    ["area"],
+)
+archive_frames_dropped_total = Counter(
+    "neopark_archive_frames_dropped_total",
+    "Total number of frames dropped because the archive queue was full",
+    ["area"],
+)
+archive_segments_deleted_total = Counter(
+    "neopark_archive_segments_deleted_total",
+    "Total number of archive segments removed by the retention policy",
+)
+
+
+class _SegmentIndex:
+    # Akses index segmen lewat mmap tanpa membaca seluruh file ke memori.
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._count = size // INDEX_RECORD.size
+        self._map = None
+        if self._count:
+            self._map = mmap.mmap(
+                self._file.fileno(),
+                self._count * INDEX_RECORD.size,
+                access=mmap.ACCESS_READ,
+            )
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        return INDEX_RECORD.unpack_from(self._map, position * INDEX_RECORD.size)
+
+    def timestamp(self, position):
+        return self[position][0]
+
+    def first_at_or_after(self, timestamp):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def _record_in_bounds(record, data_size):
+    _, offset, img_len, detection_len = record
+    return offset + img_len + detection_len <= data_size
+
+
+def _repair_segment(base):
+    # Crash di tengah penulisan bisa meninggalkan record index terpotong atau
+    # record yang datanya belum sampai ke .dat: buang sebelum append lagi,
+    # supaya record baru tetap sejajar dengan INDEX_RECORD.size.
+    index_path = base + ".idx"
+    index_size = os.path.getsize(index_path)
+    data_size = os.path.getsize(base + ".dat") if os.path.exists(base + ".dat") else 0
+    count = index_size // INDEX_RECORD.size
+    with open(index_path, "rb") as f:
+        while count:
+            f.seek((count - 1) * INDEX_RECORD.size)
+            if _record_in_bounds(
+                INDEX_RECORD.unpack(f.read(INDEX_RECORD.size)), data_size
+            ):
+                break
+            count -= 1
+    if count * INDEX_RECORD.size < index_size:
+        logger.warning(f"Frame archive: truncating torn index {index_path}")
+        os.truncate(index_path, count * INDEX_RECORD.size)
+
+
+class FrameArchive:
+    def __init__(
+        self,
+        root,
+        segment_seconds=300,
+        max_bytes=None,
+        max_age_seconds=None,
+        batch_size=32,
+        queue_size=256,
+        flush_interval=1.0,
+    ):
+        self.root = root
+        self.segment_seconds = segment_seconds
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._open_segments = {}
+        self._last_timestamp = {}
+        self._writer_thread = None
+        self._stop_event = threading.Event()
+
+    # --- Penulisan (background writer) ---
+
+    def start(self):
+        if self._writer_thread is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._writer_thread = threading.Thread(
+                target=self._writer_loop, name="frame-archive-writer", daemon=True
+            )
+            self._writer_thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        if self._writer_thread is not None:
+            self._writer_thread.join(timeout)
+            self._writer_thread = None
+        self._close_segments()
+
+    def append(self, area_id, timestamp, img_bytes, detection):
+        # Dipanggil dari request path: tidak pernah blocking.
+        try:
+            self._queue.put_nowait((area_id, timestamp, img_bytes, detection))
+            return True
+        except queue.Full:
+            archive_frames_dropped_total.labels(area=area_id).inc()
+            return False
+
+    def _writer_loop(self):
+        last_retention = 0.0
+        while not self._stop_event.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                logger.error(f"Frame archive write failed: {e}")
+            if time.time() - last_retention >= self.flush_interval * 10:
+                self.enforce_retention()
+                last_retention = time.time()
+
+    def write_batch(self, batch):
+        touched = set()
+        for area_id, timestamp, img_bytes, detection in batch:
+            # Index harus urut waktu per area supaya bisa di-bisect.
+            timestamp = max(timestamp, self._last_timestamp.get(area_id, timestamp))
+            self._last_timestamp[area_id] = timestamp
+            segment = self._segment_for(area_id, timestamp)
+            detection_bytes = json.dumps(detection).encode("utf-8")
+            offset = segment["data"].tell()
+            segment["data"].write(img_bytes)
+            segment["data"].write(detection_bytes)
+            segment["pending_index"].append(
+                INDEX_RECORD.pack(
+                    timestamp, offset, len(img_bytes), len(detection_bytes)
+                )
+            )
+            touched.add(area_id)
+            archive_frames_written_total.labels(area=area_id).inc()
+        for area_id in touched:
+            segment = self._open_segments[area_id]
+            # Data di-flush dulu sebelum index, jadi pembaca tidak pernah melihat
+            # record yang menunjuk ke byte yang belum ada.
+            segment["data"].flush()
+            segment["index"].write(b"".join(segment["pending_index"]))
+            segment["index"].flush()
+            segment["pending_index"] = []
+
+    def _segment_for(self, area_id, timestamp):
+        segment_start = int(timestamp // self.segment_seconds * self.segment_seconds)
+        segment = self._open_segments.get(area_id)
+        if segment is not None and segment["start"] == segment_start:
+            return segment
+        if segment is not None:
+            self._close_segment(segment)
+        area_dir = os.path.join(self.root, area_id)
+        os.makedirs(area_dir, exist_ok=True)
+        base = os.path.join(area_dir, f"{segment_start:012d}")
+        if os.path.exists(base + ".idx"):
+            _repair_segment(base)
+        segment = {
+            "start": segment_start,
+            "data": open(base + ".dat", "ab"),
+            "index": open(base + ".idx", "ab"),
+            "pending_index": [],
+        }
+        self._open_segments[area_id] = segment
+        return segment
+
+    def _close_segment(self, segment):
+        if segment["pending_index"]:
+            segment["data"].flush()
+            segment["index"].write(b"".join(segment["pending_index"]))
+        segment["data"].close()
+        segment["index"].close()
+
+    def _close_segments(self):
+        for segment in self._open_segments.values():
+            self._close_segment(segment)
+        self._open_segments = {}
+
+    # --- Retensi ---
+
+    def enforce_retention(self, now=None):
+        now = time.time() if now is None else now
+        active = {
+            (area_id, segment["start"])
+            for area_id, segment in self._open_segments.items()
+        }
+        segments = []
+        total_bytes = 0
+        for area_id in self.areas():
+            for segment_start in self.segments(area_id):
+                size = self._segment_size(area_id, segment_start)
+                segments.append((segment_start, area_id, size))
+                total_bytes += size
+        for segment_start, area_id, size in sorted(segments):
+            if (area_id, segment_start) in active:
+                continue
+            expired = (
+                self.max_age_seconds is not None
+                and segment_start + self.segment_seconds < now - self.max_age_seconds
+            )
+            over_budget = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not expired and not over_budget:
+                break
+            self._delete_segment(area_id, segment_start)
+            total_bytes -= size
+
+    def _segment_base(self, area_id, segment_start):
+        return os.path.join(self.root, area_id, f"{segment_start:012d}")
+
+    def _segment_size(self, area_id, segment_start):
+        base = self._segment_base(area_id, segment_start)
+        return sum(
+            os.path.getsize(base + ext)
+            for ext in (".dat", ".idx")
+            if os.path.exists(base + ext)
+        )
+
+    def _delete_segment(self, area_id, segment_start):
+        base = self._segment_base(area_id, segment_start)
+        for ext in (".idx", ".dat"):
+            try:
+                os.remove(base + ext)
+            except FileNotFoundError:
+                pass
+        archive_segments_deleted_total.inc()
+        logger.info(f"Frame archive: removed segment {base}")
+
+    # --- Pembacaan ---
+
+    def areas(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def segments(self, area_id):
+        area_dir = os.path.join(self.root, area_id)
+        if not os.path.isdir(area_dir):
+            return []
+        return sorted(
+            int(name[:-4]) for name in os.listdir(area_dir) if name.endswith(".idx")
+        )
+
+    def iter_frames(self, area_id, start=None, end=None):
+        # Generator (timestamp, jpeg_bytes, detection_dict); satu frame per baca.
+        segment_starts = self.segments(area_id)
+        if start is not None:
+            first = bisect.bisect_right(segment_starts, start) - 1
+            segment_starts = segment_starts[max(first, 0) :]
+        for segment_start in segment_starts:
+            if end is not None and segment_start > end:
+                return
+            base = self._segment_base(area_id, segment_start)
+            try:
+                index = _SegmentIndex(base + ".idx")
+            except FileNotFoundError:
+                # Segmen terhapus oleh retensi saat sedang dibaca.
+                continue
+            try:
+                data_file = open(base + ".dat", "rb")
+            except FileNotFoundError:
+                index.close()
+                continue
+            # Data selalu di-flush sebelum index, jadi ukuran ini mencakup semua
+            # record yang terlihat; record di luarnya sisa crash dan dilewati.
+            data_size = os.fstat(data_file.fileno()).st_size
+            try:
+                position = 0 if start is None else index.first_at_or_after(start)
+                while position < len(index):
+                    record = index[position]
+                    timestamp, offset, img_len, detection_len = record
+                    if end is not None and timestamp > end:
+                        return
+                    position += 1
+                    if not _record_in_bounds(record, data_size):
+                        continue
+                    data_file.seek(offset)
+                    img_bytes = data_file.read(img_len)
+                    detection = json.loads(data_file.read(detection_len))
+                    yield timestamp, img_bytes, detection
+            finally:
+                index.close()
+                data_file.close()
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge
+
+frame_pool_bytes = Gauge(
+    "neopark_frame_pool_bytes",
+    "Bytes of frame data currently held by the frame pool",
+)
+frame_pool_budget_bytes = Gauge(
+    "neopark_frame_pool_budget_bytes",
+    "Configured memory budget of the frame pool",
+)
+frame_pool_buffers = Gauge(
+    "neopark_frame_pool_buffers",
+    "Number of frame buffers currently held by the frame pool",
+)
+frame_pool_evictions_total = Counter(
+    "neopark_frame_pool_evictions_total",
+    "Total number of idle areas whose frames were evicted from the frame pool",
+)
+
+
+class FramePool:
+    # Satu buffer per (area, jenis frame) dengan budget memori global. Buffer
+    # adalah objek bytes yang dipakai bersama oleh state, arsip dan semua viewer
+    # tanpa disalin. Area yang sedang ditonton di-pin; area idle dibuang LRU.
+    def __init__(self, budget_bytes, on_evict=None):
+        self.budget_bytes = budget_bytes
+        self._on_evict = on_evict
+        self._lock = threading.Lock()
+        self._areas = OrderedDict()
+        self.used_bytes = 0
+        frame_pool_budget_bytes.set(budget_bytes)
+
+    def _area_locked(self, area_id):
+        area = self._areas.get(area_id)
+        if area is None:
+            area = {"buffers": {}, "viewers": 0}
+            self._areas[area_id] = area
+        self._areas.move_to_end(area_id)
+        return area
+
+    def _update_metrics_locked(self):
+        frame_pool_bytes.set(self.used_bytes)
+        frame_pool_buffers.set(sum(len(a["buffers"]) for a in self._areas.values()))
+
+    def put(self, area_id, kind, data):
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        with self._lock:
+            area = self._area_locked(area_id)
+            previous = area["buffers"].get(kind)
+            self.used_bytes += len(data) - (0 if previous is None else len(previous))
+            area["buffers"][kind] = data
+            evicted = self._evict_locked(protect=area_id)
+            self._update_metrics_locked()
+        if self._on_evict is not None:
+            for evicted_area_id, buffers in evicted:
+                self._on_evict(evicted_area_id, buffers)
+        return data
+
+    def discard(self, area_id, kind):
+        with self._lock:
+            area = self._areas.get(area_id)
+            data = area["buffers"].pop(kind, None) if area else None
+            if data is not None:
+                self.used_bytes -= len(data)
+                self._update_metrics_locked()
+
+    def touch(self, area_id):
+        with self._lock:
+            self._area_locked(area_id)
+
+    @contextmanager
+    def pin(self, area_id):
+        # Area dengan viewer aktif tidak pernah dibuang.
+        with self._lock:
+            self._area_locked(area_id)["viewers"] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._areas[area_id]["viewers"] -= 1
+                self._areas.move_to_end(area_id)
+
+    def _evict_locked(self, protect):
+        evicted = []
+        for area_id, area in list(self._areas.items()):
+            if self.used_bytes <= self.budget_bytes:
+                break
+            if area_id == protect or area["viewers"] or not area["buffers"]:
+                continue
+            self.used_bytes -= sum(len(data) for data in area["buffers"].values())
+            evicted.append((area_id, area["buffers"]))
+            area["buffers"] = {}
+            frame_pool_evictions_total.inc()
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            return {
+                "used_bytes": self.used_bytes,
+                "budget_bytes": self.budget_bytes,
+                "buffers": sum(len(a["buffers"]) for a in self._areas.values()),
+                "pinned_areas": sorted(
+                    area_id for area_id, a in self._areas.items() if a["viewers"]
+                ),
+            }
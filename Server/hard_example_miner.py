@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+
+from prometheus_client import Counter
+
+from detection import CONFIDENCE_THRESHOLD, box_overlap
+
+logger = logging.getLogger(__name__)
+
+hard_examples_captured_total = Counter(
+    "neopark_hard_examples_captured_total",
+    "Total number of frames captured as hard examples",
+    ["area", "reason"],
+)
+hard_examples_dropped_total = Counter(
+    "neopark_hard_examples_dropped_total",
+    "Total number of hard example candidates dropped by the rate limit or full queue",
+    ["area"],
+)
+
+
+def yolo_label_lines(detections, width, height, class_id=0):
+    # Format label YOLO: class cx cy w h (ternormalisasi 0..1).
+    lines = []
+    for det in detections:
+        x1, y1, x2, y2 = det["bounding_box"]
+        x1, x2 = max(0, x1), min(width, x2)
+        y1, y2 = max(0, y1), min(height, y2)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        lines.append(
+            f"{class_id} {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} "
+            f"{(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f}"
+        )
+    return lines
+
+
+def unmatched_boxes(current, previous, iou_threshold):
+    # Jumlah box yang muncul/hilang tanpa pasangan di frame sebelumnya.
+    matched_previous = set()
+    matched = 0
+    for det in current:
+        for index, prev in enumerate(previous):
+            if index in matched_previous:
+                continue
+            if box_overlap(det["bounding_box"], prev["bounding_box"]) >= iou_threshold:
+                matched_previous.add(index)
+                matched += 1
+                break
+    return (len(current) - matched) + (len(previous) - matched)
+
+
+class HardExampleMiner:
+    def __init__(
+        self,
+        output_dir,
+        band=(0.4, CONFIDENCE_THRESHOLD),
+        count_change=3,
+        track_iou=0.3,
+        track_disagreement=2,
+        max_per_minute=30,
+        batch_size=8,
+        queue_size=64,
+        val_fraction=0.1,
+        class_names=("car",),
+    ):
+        self.output_dir = output_dir
+        self.band = band
+        self.count_change = count_change
+        self.track_iou = track_iou
+        self.track_disagreement = track_disagreement
+        self.max_per_minute = max_per_minute
+        self.batch_size = batch_size
+        self.val_fraction = val_fraction
+        self.class_names = list(class_names)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._previous = {}
+        self._tokens = float(max_per_minute)
+        self._tokens_updated = time.monotonic()
+        self._writer_thread = None
+        self._stop_event = threading.Event()
+
+    # --- Sampling (request path) ---
+
+    def reasons_for(self, area_id, candidates):
+        low, high = self.band
+        confident = [c for c in candidates if c["confidence"] > high]
+        reasons = []
+        if any(low <= c["confidence"] <= high for c in candidates):
+            reasons.append("borderline")
+        with self._lock:
+            previous = self._previous.get(area_id)
+            self._previous[area_id] = confident
+        if previous is not None:
+            if abs(len(confident) - len(previous)) >= self.count_change:
+                reasons.append("count_change")
+            elif (
+                unmatched_boxes(confident, previous, self.track_iou)
+                >= self.track_disagreement
+            ):
+                reasons.append("track_disagreement")
+        return reasons
+
+    def _take_token(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                float(self.max_per_minute),
+                self._tokens + (now - self._tokens_updated) * self.max_per_minute / 60,
+            )
+            self._tokens_updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def consider(self, area_id, img_bytes, candidates, image_size, timestamp=None):
+        reasons = self.reasons_for(area_id, candidates)
+        if not reasons:
+            return None
+        if not self._take_token():
+            hard_examples_dropped_total.labels(area=area_id).inc()
+            return None
+        sample = {
+            "area": area_id,
+            "timestamp": time.time() if timestamp is None else timestamp,
+            "reasons": reasons,
+            "image": img_bytes,
+            "image_size": image_size,
+            "candidates": candidates,
+        }
+        try:
+            self._queue.put_nowait(sample)
+        except queue.Full:
+            hard_examples_dropped_total.labels(area=area_id).inc()
+            return None
+        for reason in reasons:
+            hard_examples_captured_total.labels(area=area_id, reason=reason).inc()
+        return reasons
+
+    # --- Penulisan dataset (background) ---
+
+    def start(self):
+        if self._writer_thread is None:
+            self.write_dataset_yaml()
+            self._writer_thread = threading.Thread(
+                target=self._writer_loop, name="hard-example-writer", daemon=True
+            )
+            self._writer_thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        if self._writer_thread is not None:
+            self._writer_thread.join(timeout)
+            self._writer_thread = None
+
+    def _writer_loop(self):
+        while not self._stop_event.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                logger.error(f"Hard example write failed: {e}")
+
+    def _split_for(self, name):
+        bucket = zlib.crc32(name.encode("utf-8")) % 1000
+        return "val" if bucket < self.val_fraction * 1000 else "train"
+
+    def write_batch(self, batch):
+        manifest_lines = []
+        for sample in batch:
+            name = f"{sample['area']}_{int(sample['timestamp'] * 1000)}"
+            split = self._split_for(name)
+            images_dir = os.path.join(self.output_dir, split, "images")
+            labels_dir = os.path.join(self.output_dir, split, "labels")
+            os.makedirs(images_dir, exist_ok=True)
+            os.makedirs(labels_dir, exist_ok=True)
+
+            # Label awal = semua kandidat di atas batas bawah band, untuk direview.
+            proposals = [
+                c for c in sample["candidates"] if c["confidence"] >= self.band[0]
+            ]
+            width, height = sample["image_size"]
+            with open(os.path.join(images_dir, name + ".jpg"), "wb") as f:
+                f.write(sample["image"])
+            with open(os.path.join(labels_dir, name + ".txt"), "w") as f:
+                lines = yolo_label_lines(proposals, width, height)
+                f.write("\n".join(lines) + ("\n" if lines else ""))
+            manifest_lines.append(
+                json.dumps(
+                    {
+                        "name": name,
+                        "split": split,
+                        "area": sample["area"],
+                        "timestamp": sample["timestamp"],
+                        "reasons": sample["reasons"],
+                        "confidences": [c["confidence"] for c in proposals],
+                    }
+                )
+            )
+        with open(os.path.join(self.output_dir, "manifest.ndjson"), "a") as f:
+            f.write("\n".join(manifest_lines) + "\n")
+
+    def write_dataset_yaml(self):
+        # Bisa langsung dipakai: python finetune_yolov8_vehicle.py <dir>/vehicle.yaml
+        for split in ("train", "val"):
+            for kind in ("images", "labels"):
+                os.makedirs(os.path.join(self.output_dir, split, kind), exist_ok=True)
+        path = os.path.join(self.output_dir, "vehicle.yaml")
+        names = ", ".join(f'"{name}"' for name in self.class_names)
+        with open(path, "w") as f:
+            f.write(
+                f"path: {os.path.abspath(self.output_dir)}\n"
+                "train: train/images\n"
+                "val: val/images\n"
+                "\n"
+                f"nc: {len(self.class_names)}\n"
+                f"names: [{names}]\n"
+            )
+        return path
@@ -1,7 +1,12 @@
 from flask import Flask, request, jsonify, Response
 from ultralytics import YOLO
 from PIL import Image, ImageDraw, ImageFont
+import functools
+import hmac
 import io
+import json
+import math
+import os
 import threading
 import time
 import logging
@@ -10,33 +15,257 @@ from datetime import datetime
 from prometheus_flask_exporter import PrometheusMetrics
 from prometheus_client import Counter, Gauge, Histogram
 
+from detection import (
+    CONFIDENCE_THRESHOLD,
+    confident_car_detections,
+    extract_car_candidates,
+    run_tiled_inference,
+    validate_tile_settings,
+)
+from frame_archive import FrameArchive
+from hard_example_miner import HardExampleMiner
+from shadow_model import ShadowEvaluator, inference_latency_seconds
+from admission import AdmissionController, AdmissionRejected
+from renditions import RENDITIONS, RenditionCache
+from event_journal import EventJournal
+from frame_pool import FramePool
+from runtime_config import apply_runtime_config, load_runtime_config
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-MODEL_FILE_PATH = "fine-best.pt"
+# Hasil tune_runtime.py: thread torch, CPU affinity, worker, batch dan imgsz.
+# Variabel env yang di-set eksplisit tetap menang atas file ini.
+RUNTIME_CONFIG_PATH = os.environ.get("NEOPARK_RUNTIME_CONFIG")
+RUNTIME_CONFIG = load_runtime_config(RUNTIME_CONFIG_PATH) if RUNTIME_CONFIG_PATH else {}
+
+# Bisa diarahkan ke varian lain, mis. hasil sweep_model_variants.py (OpenVINO INT8).
+MODEL_FILE_PATH = os.environ.get("NEOPARK_MODEL_PATH", "fine-best.pt")
+MODEL_IMGSZ = int(
+    os.environ.get("NEOPARK_MODEL_IMGSZ", str(RUNTIME_CONFIG.get("imgsz", 0)))
+) or None
+MODEL_PREDICT_KWARGS = {"imgsz": MODEL_IMGSZ} if MODEL_IMGSZ else {}
+# Reload otomatis saat file model berubah (0 = nonaktif).
+MODEL_WATCH_INTERVAL = float(os.environ.get("NEOPARK_MODEL_WATCH_INTERVAL", "0"))
+SHADOW_SAMPLE_RATE = float(os.environ.get("NEOPARK_SHADOW_SAMPLE_RATE", "0.1"))
+# Admin API nonaktif (403) selama token belum di-set.
+ADMIN_TOKEN = os.environ.get("NEOPARK_ADMIN_TOKEN")
+# Reload/shadow lewat admin API hanya boleh memuat model dari direktori ini.
+MODELS_DIR = os.environ.get(
+    "NEOPARK_MODELS_DIR", os.path.dirname(os.path.abspath(MODEL_FILE_PATH))
+)
 _model_instance = None
+_model_reload_lock = threading.Lock()
+model_state = {
+    "path": MODEL_FILE_PATH,
+    "loaded_at": None,
+    "reload_status": "idle",
+    "last_error": None,
+    "shadow_status": "disabled",
+    "shadow_error": None,
+}
+shadow_evaluator = None
+
+
+def _parse_area_list(value):
+    return {item.strip().upper() for item in value.split(",") if item.strip()}
+
+
+def _parse_area_map(value, cast=str):
+    # "A1=4,A2=1" -> {"A1": 4, "A2": 1}
+    mapping = {}
+    for item in value.split(","):
+        if "=" in item:
+            area_id, _, setting = item.partition("=")
+            mapping[area_id.strip().upper()] = cast(setting.strip())
+    return mapping
+
+
+# Sliced inference untuk kamera wide-angle resolusi tinggi (opt-in per area).
+TILED_INFERENCE_AREAS = _parse_area_list(os.environ.get("NEOPARK_TILED_AREAS", ""))
+TILE_SIZE = int(os.environ.get("NEOPARK_TILE_SIZE", "640"))
+TILE_OVERLAP = float(os.environ.get("NEOPARK_TILE_OVERLAP", "0.2"))
+TILE_BATCH_SIZE = int(
+    os.environ.get("NEOPARK_TILE_BATCH_SIZE", str(RUNTIME_CONFIG.get("batch_size", 8)))
+)
+TILE_INCLUDE_FULL_FRAME = os.environ.get("NEOPARK_TILE_FULL_FRAME", "1") != "0"
+validate_tile_settings(TILE_SIZE, TILE_OVERLAP, TILE_BATCH_SIZE)
+
+# Arsip frame opsional (aktif jika NEOPARK_ARCHIVE_DIR di-set).
+ARCHIVE_DIR = os.environ.get("NEOPARK_ARCHIVE_DIR")
+ARCHIVE_SEGMENT_SECONDS = int(os.environ.get("NEOPARK_ARCHIVE_SEGMENT_SECONDS", "300"))
+ARCHIVE_MAX_BYTES = int(os.environ.get("NEOPARK_ARCHIVE_MAX_BYTES", str(10 * 1024**3)))
+ARCHIVE_MAX_AGE_HOURS = float(os.environ.get("NEOPARK_ARCHIVE_MAX_AGE_HOURS", "72"))
+REPLAY_MAX_GAP_SECONDS = 1.0
+
+# Hard-example mining untuk dataset fine-tune (aktif jika direktori di-set).
+HARD_EXAMPLE_DIR = os.environ.get("NEOPARK_HARD_EXAMPLE_DIR")
+HARD_EXAMPLE_BAND = tuple(
+    float(v) for v in os.environ.get("NEOPARK_HARD_EXAMPLE_BAND", "0.4,0.8").split(",")
+)
+HARD_EXAMPLE_COUNT_CHANGE = int(
+    os.environ.get("NEOPARK_HARD_EXAMPLE_COUNT_CHANGE", "3")
+)
+HARD_EXAMPLE_MAX_PER_MINUTE = int(
+    os.environ.get("NEOPARK_HARD_EXAMPLE_MAX_PER_MINUTE", "30")
+)
+
+# Admission control: batas inference paralel, bobot dan prioritas per area
+# (prioritas kecil dilayani dulu, mis. area gerbang = 0).
+ADMISSION_CAPACITY = int(
+    os.environ.get("NEOPARK_ADMISSION_CAPACITY", str(RUNTIME_CONFIG.get("workers", 4)))
+)
+ADMISSION_MAX_QUEUE = int(os.environ.get("NEOPARK_ADMISSION_MAX_QUEUE", "32"))
+AREA_WEIGHTS = _parse_area_map(os.environ.get("NEOPARK_AREA_WEIGHTS", ""), float)
+AREA_PRIORITIES = _parse_area_map(os.environ.get("NEOPARK_AREA_PRIORITIES", ""), int)
+FRAME_DEADLINE_SECONDS = float(os.environ.get("NEOPARK_FRAME_DEADLINE_SECONDS", "5"))
+
+# Journal event perubahan okupansi (aktif jika NEOPARK_EVENT_JOURNAL_DIR di-set).
+EVENT_JOURNAL_DIR = os.environ.get("NEOPARK_EVENT_JOURNAL_DIR")
+EVENT_JOURNAL_MAX_FILE_BYTES = int(
+    os.environ.get("NEOPARK_EVENT_JOURNAL_MAX_FILE_BYTES", str(16 * 1024**2))
+)
+EVENT_JOURNAL_MAX_FILES = int(os.environ.get("NEOPARK_EVENT_JOURNAL_MAX_FILES", "20"))
+CONNECTION_TIMEOUT_SECONDS = 10
+# Baris kosong dikirim ke follower /events setelah idle selama ini.
+EVENTS_HEARTBEAT_SECONDS = float(
+    os.environ.get("NEOPARK_EVENTS_HEARTBEAT_SECONDS", "15")
+)
+
+# Budget memori global untuk frame mentah, frame hasil deteksi dan rendition.
+FRAME_MEMORY_BUDGET_BYTES = int(
+    float(os.environ.get("NEOPARK_FRAME_MEMORY_BUDGET_MB", "256")) * 1024**2
+)
+FRAME_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+FRAME_TRAILER = b"\r\n"
+
+runtime_settings = {
+    **apply_runtime_config(RUNTIME_CONFIG),
+    "workers": ADMISSION_CAPACITY,
+    "batch_size": TILE_BATCH_SIZE,
+    "imgsz": MODEL_IMGSZ,
+    "config_path": RUNTIME_CONFIG_PATH,
+}
+logger.info(f"Runtime settings: {runtime_settings}")
 
 
 def get_yolo_model():
     global _model_instance
     if _model_instance is None:
+        model_path = model_state["path"]
         try:
-            logger.info(f"Attempting to load YOLO model from: {MODEL_FILE_PATH}")
-            _model_instance = YOLO(MODEL_FILE_PATH)
+            logger.info(f"Attempting to load YOLO model from: {model_path}")
+            _model_instance = YOLO(model_path, task="detect")
+            model_state["loaded_at"] = datetime.now().isoformat()
             logger.info("YOLO model loaded successfully for application runtime.")
         except Exception as e:
-            logger.error(
-                f"FATAL: Failed to load YOLO model from {MODEL_FILE_PATH}: {e}"
-            )
+            logger.error(f"FATAL: Failed to load YOLO model from {model_path}: {e}")
             raise RuntimeError(f"Could not load YOLO model: {e}")
     return _model_instance
 
 
+def load_yolo_model(model_path):
+    model = YOLO(model_path, task="detect")
+    # Warm-up supaya frame pertama setelah swap tidak kena cold-start.
+    model(Image.new("RGB", (640, 480), color="gray"), **MODEL_PREDICT_KWARGS)
+    return model
+
+
+def reload_yolo_model(model_path):
+    global _model_instance
+    if not _model_reload_lock.acquire(blocking=False):
+        return False
+    try:
+        model_state.update({"reload_status": "loading", "last_error": None})
+        logger.info(f"Hot-reloading YOLO model from: {model_path}")
+        new_model = load_yolo_model(model_path)
+        # Swap atomik; frame yang sedang diproses tetap selesai dengan model lama
+        # karena process_image_for_area memegang referensinya sendiri.
+        _model_instance = new_model
+        model_state.update(
+            {
+                "path": model_path,
+                "loaded_at": datetime.now().isoformat(),
+                "reload_status": "idle",
+            }
+        )
+        logger.info(f"YOLO model swapped to: {model_path}")
+        return True
+    except Exception as e:
+        logger.error(f"Hot reload of {model_path} failed, keeping old model: {e}")
+        model_state.update({"reload_status": "failed", "last_error": str(e)})
+        return False
+    finally:
+        _model_reload_lock.release()
+
+
+def _model_file_signature(model_path):
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def watch_model_file(interval):
+    last_signature = _model_file_signature(model_state["path"])
+    pending_signature = None
+    while True:
+        time.sleep(interval)
+        signature = _model_file_signature(model_state["path"])
+        if signature is None or signature == last_signature:
+            pending_signature = None
+            continue
+        # Tunggu satu interval tanpa perubahan supaya file selesai disalin.
+        if signature != pending_signature:
+            pending_signature = signature
+            continue
+        if reload_yolo_model(model_state["path"]):
+            last_signature = signature
+        pending_signature = None
+
+
+def count_cars_for_area(area_id, model, img):
+    candidates = run_inference_for_area(area_id, model, img)
+    return len(confident_car_detections(candidates, area_id))
+
+
+def start_shadow_model(model_path, sample_rate):
+    global shadow_evaluator
+    model_state.update({"shadow_status": "loading", "shadow_error": None})
+    try:
+        model = load_yolo_model(model_path)
+    except Exception as e:
+        logger.error(f"Failed to load shadow model {model_path}: {e}")
+        model_state.update({"shadow_status": "failed", "shadow_error": str(e)})
+        return None
+    previous = shadow_evaluator
+    shadow_evaluator = ShadowEvaluator(
+        model, model_path, count_cars_for_area, sample_rate
+    ).start()
+    if previous is not None:
+        previous.stop()
+    model_state["shadow_status"] = "running"
+    logger.info(f"Shadow model {model_path} running on {sample_rate:.0%} of frames")
+    return shadow_evaluator
+
+
+def stop_shadow_model():
+    global shadow_evaluator
+    previous, shadow_evaluator = shadow_evaluator, None
+    if previous is not None:
+        previous.stop()
+    model_state["shadow_status"] = "disabled"
+    return previous
+
+
 areas_data = {
     "A1": {
         "latest_detection": {},
         "latest_frame": None,
         "processed_frame": None,
+        "latest_frame_version": 0,
+        "processed_frame_version": 0,
         "last_frame_time": None,
         "connection_status": False,
         "frame_lock": threading.Lock(),
@@ -45,12 +274,94 @@ areas_data = {
         "latest_detection": {},
         "latest_frame": None,
         "processed_frame": None,
+        "latest_frame_version": 0,
+        "processed_frame_version": 0,
         "last_frame_time": None,
         "connection_status": False,
         "frame_lock": threading.Lock(),
     },
 }
 
+frame_archive = None
+if ARCHIVE_DIR:
+    frame_archive = FrameArchive(
+        ARCHIVE_DIR,
+        segment_seconds=ARCHIVE_SEGMENT_SECONDS,
+        max_bytes=ARCHIVE_MAX_BYTES,
+        max_age_seconds=ARCHIVE_MAX_AGE_HOURS * 3600,
+    )
+    frame_archive.start()
+
+hard_example_miner = None
+if HARD_EXAMPLE_DIR:
+    hard_example_miner = HardExampleMiner(
+        HARD_EXAMPLE_DIR,
+        band=HARD_EXAMPLE_BAND,
+        count_change=HARD_EXAMPLE_COUNT_CHANGE,
+        max_per_minute=HARD_EXAMPLE_MAX_PER_MINUTE,
+    )
+    hard_example_miner.start()
+
+admission_controller = AdmissionController(
+    capacity=ADMISSION_CAPACITY,
+    max_queue=ADMISSION_MAX_QUEUE,
+    weights=AREA_WEIGHTS,
+    priorities=AREA_PRIORITIES,
+    deadline_seconds=FRAME_DEADLINE_SECONDS,
+)
+
+
+def evict_area_frames(area_id, buffers):
+    # Dipanggil FramePool untuk area idle; feed kembali ke placeholder.
+    area_data = areas_data.get(area_id)
+    if area_data is None:
+        return
+    with area_data["frame_lock"]:
+        for frame_key in ("latest_frame", "processed_frame"):
+            if frame_key in buffers and area_data[frame_key] is buffers[frame_key]:
+                area_data[frame_key] = None
+    logger.info(f"Area {area_id}: idle frames evicted from frame pool")
+
+
+frame_pool = FramePool(FRAME_MEMORY_BUDGET_BYTES, on_evict=evict_area_frames)
+rendition_cache = RenditionCache(pool=frame_pool)
+_placeholder_images = {}
+_transition_lock = threading.Lock()
+
+event_journal = None
+if EVENT_JOURNAL_DIR:
+    event_journal = EventJournal(
+        EVENT_JOURNAL_DIR,
+        max_file_bytes=EVENT_JOURNAL_MAX_FILE_BYTES,
+        max_files=EVENT_JOURNAL_MAX_FILES,
+    )
+    event_journal.start()
+
+
+def emit_event(event_type, **fields):
+    if event_journal is not None:
+        event_journal.emit(event_type, **fields)
+
+
+def refresh_connection_status(area_id):
+    area_data = areas_data[area_id]
+    if area_data["last_frame_time"]:
+        time_diff = (datetime.now() - area_data["last_frame_time"]).total_seconds()
+        if time_diff > CONNECTION_TIMEOUT_SECONDS:
+            with _transition_lock:
+                if area_data["connection_status"]:
+                    area_data["connection_status"] = False
+                    emit_event("connection", area=area_id, connected=False)
+
+
+def watch_connections(interval):
+    # Tanpa ini, event disconnect hanya muncul ketika ada yang polling status.
+    while True:
+        time.sleep(interval)
+        for area_id in areas_data:
+            refresh_connection_status(area_id)
+
+
 app = Flask(__name__)
 
 metrics = PrometheusMetrics(app, group_by="endpoint")
@@ -76,6 +387,20 @@ yolo_car_detections_total = Counter(
 )
 
 
+def run_inference_for_area(area_id, model, img):
+    if area_id in TILED_INFERENCE_AREAS:
+        return run_tiled_inference(
+            model,
+            img,
+            tile_size=TILE_SIZE,
+            overlap=TILE_OVERLAP,
+            batch_size=TILE_BATCH_SIZE,
+            include_full_frame=TILE_INCLUDE_FULL_FRAME,
+            predict_kwargs=MODEL_PREDICT_KWARGS,
+        )
+    return extract_car_candidates(model(img, **MODEL_PREDICT_KWARGS), model.names)
+
+
 def process_image_for_area(area_id, img_bytes):
     area_data = areas_data[area_id]
     model_to_use = get_yolo_model()
@@ -83,61 +408,57 @@ def process_image_for_area(area_id, img_bytes):
     try:
         logger.info(f"Processing image for Area {area_id}: {len(img_bytes)} bytes")
 
-        area_data["connection_status"] = True
-        area_data["last_frame_time"] = datetime.now()
+        frame_time = datetime.now()
+        with _transition_lock:
+            area_data["last_frame_time"] = frame_time
+            if not area_data["connection_status"]:
+                area_data["connection_status"] = True
+                emit_event("connection", area=area_id, connected=True)
 
+        # Di luar frame_lock: put() bisa memanggil evict_area_frames area lain.
+        img_bytes = frame_pool.put(area_id, "latest_frame", img_bytes)
         with area_data["frame_lock"]:
             area_data["latest_frame"] = img_bytes
+            area_data["latest_frame_version"] += 1
 
         img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-        results = model_to_use(img)
-        car_detections_list = []
-        num_cars_in_frame = 0
+        inference_started = time.perf_counter()
+        car_candidates = run_inference_for_area(area_id, model_to_use, img)
+        inference_latency_seconds.labels(model="primary").observe(
+            time.perf_counter() - inference_started
+        )
+        car_detections_list = confident_car_detections(car_candidates, area_id)
+        num_cars_in_frame = len(car_detections_list)
+
+        shadow = shadow_evaluator
+        if shadow is not None:
+            shadow.submit(area_id, img, num_cars_in_frame)
 
         img_with_boxes = img.copy()
         draw = ImageDraw.Draw(img_with_boxes)
 
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    class_id = int(box.cls[0])
-                    class_name = model_to_use.names[class_id]
-                    if class_name == "car":
-                        x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                        conf = float(box.conf[0])
-
-                        if conf > 0.8:
-                            num_cars_in_frame += 1
-                            yolo_confidence_scores.labels(area=area_id).observe(conf)
-                            yolo_car_detections_total.labels(area=area_id).inc()
-
-                            draw.rectangle([x1, y1, x2, y2], outline="red", width=3)
-                            label_text_area = f"Area {area_id}"
-                            label_text_car = f"Car: {conf:.2f}"
-                            try:
-                                font = ImageFont.truetype("arial.ttf", 36)
-                                draw.text(
-                                    (x1, y1 - 55),
-                                    label_text_area,
-                                    fill="blue",
-                                    font=font,
-                                )
-                                draw.text(
-                                    (x1, y1 - 35), label_text_car, fill="red", font=font
-                                )
-                            except IOError:
-                                draw.text((x1, y1 - 30), label_text_area, fill="blue")
-                                draw.text((x1, y1 - 10), label_text_car, fill="red")
-
-                            car_detections_list.append(
-                                {
-                                    "class": class_name,
-                                    "confidence": conf,
-                                    "bounding_box": [x1, y1, x2, y2],
-                                    "area": area_id,
-                                }
-                            )
+        for detection in car_detections_list:
+            x1, y1, x2, y2 = detection["bounding_box"]
+            conf = detection["confidence"]
+            yolo_confidence_scores.labels(area=area_id).observe(conf)
+            yolo_car_detections_total.labels(area=area_id).inc()
+
+            draw.rectangle([x1, y1, x2, y2], outline="red", width=3)
+            label_text_area = f"Area {area_id}"
+            label_text_car = f"Car: {conf:.2f}"
+            try:
+                font = ImageFont.truetype("arial.ttf", 36)
+                draw.text(
+                    (x1, y1 - 55),
+                    label_text_area,
+                    fill="blue",
+                    font=font,
+                )
+                draw.text((x1, y1 - 35), label_text_car, fill="red", font=font)
+            except IOError:
+                draw.text((x1, y1 - 30), label_text_area, fill="blue")
+                draw.text((x1, y1 - 10), label_text_car, fill="red")
+
         print(
             f"DEBUG: Final num_cars_in_frame for area {area_id} before set: {num_cars_in_frame}"
         )  # DEBUG
@@ -155,10 +476,36 @@ def process_image_for_area(area_id, img_bytes):
         img_byte_arr = io.BytesIO()
         img_with_boxes.save(img_byte_arr, format="JPEG", quality=85)
 
+        processed_frame = frame_pool.put(
+            area_id, "processed_frame", img_byte_arr.getvalue()
+        )
         with area_data["frame_lock"]:
-            area_data["processed_frame"] = img_byte_arr.getvalue()
+            area_data["processed_frame"] = processed_frame
+            area_data["processed_frame_version"] += 1
+
+        with _transition_lock:
+            old_count = len(area_data["latest_detection"].get("detections", []))
+            area_data["latest_detection"] = {"detections": car_detections_list}
+            if old_count != num_cars_in_frame:
+                emit_event(
+                    "occupancy",
+                    area=area_id,
+                    old_count=old_count,
+                    new_count=num_cars_in_frame,
+                )
+
+        if frame_archive is not None:
+            frame_archive.append(
+                area_id,
+                frame_time.timestamp(),
+                img_bytes,
+                {"detections": car_detections_list, "car_count": num_cars_in_frame},
+            )
 
-        area_data["latest_detection"] = {"detections": car_detections_list}
+        if hard_example_miner is not None:
+            hard_example_miner.consider(
+                area_id, img_bytes, car_candidates, img.size, frame_time.timestamp()
+            )
 
         logger.info(
             f"Area {area_id}: Found {num_cars_in_frame} cars for occupancy metric."
@@ -176,13 +523,7 @@ def process_image_for_area(area_id, img_bytes):
 
 @app.route("/a1/upload", methods=["POST"])
 def upload_image_a1():
-    if not request.data:
-        return jsonify({"error": "No image data provided"}), 400
-    try:
-        result = process_image_for_area("A1", request.data)
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({"error": f"Processing failed: {str(e)}"}), 500
+    return upload_image_for_area("A1")
 
 
 @app.route("/a1/get_detections", methods=["GET"])
@@ -198,30 +539,18 @@ def get_status_a1():
 @app.route("/a1/video_feed")
 @metrics.do_not_track()
 def video_feed_a1():
-    return Response(
-        generate_frames_for_area("A1"),
-        mimetype="multipart/x-mixed-replace; boundary=frame",
-    )
+    return stream_feed_for_area("A1", generate_frames_for_area)
 
 
 @app.route("/a1/raw_feed")
 @metrics.do_not_track()
 def raw_feed_a1():
-    return Response(
-        generate_raw_frames_for_area("A1"),
-        mimetype="multipart/x-mixed-replace; boundary=frame",
-    )
+    return stream_feed_for_area("A1", generate_raw_frames_for_area)
 
 
 @app.route("/a2/upload", methods=["POST"])
 def upload_image_a2():
-    if not request.data:
-        return jsonify({"error": "No image data provided"}), 400
-    try:
-        result = process_image_for_area("A2", request.data)
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({"error": f"Processing failed: {str(e)}"}), 500
+    return upload_image_for_area("A2")
 
 
 @app.route("/a2/get_detections", methods=["GET"])
@@ -237,19 +566,13 @@ def get_status_a2():
 @app.route("/a2/video_feed")
 @metrics.do_not_track()
 def video_feed_a2():
-    return Response(
-        generate_frames_for_area("A2"),
-        mimetype="multipart/x-mixed-replace; boundary=frame",
-    )
+    return stream_feed_for_area("A2", generate_frames_for_area)
 
 
 @app.route("/a2/raw_feed")
 @metrics.do_not_track()
 def raw_feed_a2():
-    return Response(
-        generate_raw_frames_for_area("A2"),
-        mimetype="multipart/x-mixed-replace; boundary=frame",
-    )
+    return stream_feed_for_area("A2", generate_raw_frames_for_area)
 
 
 @app.route("/combined/get_detections", methods=["GET"])
@@ -270,7 +593,7 @@ def get_combined_detections():
                 "detections": a2_data["detections"],
                 "connection_status": a2_data["connection_status"],
             },
-            "confidence_threshold": 0.8,
+            "confidence_threshold": CONFIDENCE_THRESHOLD,
         }
     )
 
@@ -280,12 +603,218 @@ def get_combined_status():
     return jsonify({"area_a1": get_status_data("A1"), "area_a2": get_status_data("A2")})
 
 
+def require_admin_token(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return (
+                jsonify({"error": "Admin API disabled: NEOPARK_ADMIN_TOKEN not set"}),
+                403,
+            )
+        if not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {ADMIN_TOKEN}"
+        ):
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def resolve_admin_model_path(model_path):
+    # Path dari request di-resolve (termasuk symlink) dan harus di dalam MODELS_DIR:
+    # file model di-unpickle oleh torch.load, jadi jangan muat dari sembarang tempat.
+    models_dir = os.path.realpath(MODELS_DIR)
+    resolved = os.path.realpath(os.path.join(models_dir, model_path))
+    if os.path.commonpath([models_dir, resolved]) != models_dir:
+        raise ValueError(f"Model path must be inside {MODELS_DIR}: {model_path}")
+    if not os.path.exists(resolved):
+        raise ValueError(f"Model file not found: {model_path}")
+    return resolved
+
+
+def get_model_status_data():
+    shadow = shadow_evaluator
+    return {
+        "model_path": model_state["path"],
+        "loaded_at": model_state["loaded_at"],
+        "reload_status": model_state["reload_status"],
+        "last_error": model_state["last_error"],
+        "shadow": {
+            "status": model_state["shadow_status"],
+            "error": model_state["shadow_error"],
+            "model_path": shadow.model_path if shadow else None,
+            "sample_rate": shadow.sample_rate if shadow else None,
+            "stats": dict(shadow.stats) if shadow else None,
+        },
+    }
+
+
+@app.route("/admin/model", methods=["GET"])
+@require_admin_token
+def admin_model_status():
+    return jsonify(get_model_status_data())
+
+
+@app.route("/admin/reload_model", methods=["POST"])
+@require_admin_token
+def admin_reload_model():
+    payload = request.get_json(silent=True) or {}
+    model_path = payload.get("path")
+    if model_path is None:
+        model_path = model_state["path"]
+        if not os.path.exists(model_path):
+            return jsonify({"error": f"Model file not found: {model_path}"}), 400
+    else:
+        try:
+            model_path = resolve_admin_model_path(str(model_path))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    if _model_reload_lock.locked():
+        return jsonify({"error": "Model reload already in progress"}), 409
+    threading.Thread(
+        target=reload_yolo_model, args=(model_path,), name="model-reload", daemon=True
+    ).start()
+    return jsonify({"status": "Model reload started", "path": model_path}), 202
+
+
+@app.route("/admin/shadow_model", methods=["POST", "DELETE"])
+@require_admin_token
+def admin_shadow_model():
+    if request.method == "DELETE":
+        stop_shadow_model()
+        return jsonify({"status": "Shadow model stopped"})
+    payload = request.get_json(silent=True) or {}
+    model_path = payload.get("path")
+    try:
+        sample_rate = float(payload.get("sample_rate", SHADOW_SAMPLE_RATE))
+    except (TypeError, ValueError):
+        return jsonify({"error": "sample_rate must be a number"}), 400
+    if not model_path:
+        return jsonify({"error": "path is required"}), 400
+    try:
+        model_path = resolve_admin_model_path(str(model_path))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 0 < sample_rate <= 1:
+        return jsonify({"error": "sample_rate must be in (0, 1]"}), 400
+    threading.Thread(
+        target=start_shadow_model,
+        args=(model_path, sample_rate),
+        name="shadow-model-load",
+        daemon=True,
+    ).start()
+    return jsonify({"status": "Shadow model loading", "path": model_path}), 202
+
+
+@app.route("/admin/shadow_model/promote", methods=["POST"])
+@require_admin_token
+def admin_promote_shadow_model():
+    global _model_instance
+    # Jangan menunggu reload yang sedang berjalan, dan jangan bongkar shadow dulu.
+    if not _model_reload_lock.acquire(blocking=False):
+        return jsonify({"error": "Model reload already in progress"}), 409
+    try:
+        shadow = stop_shadow_model()
+        if shadow is None:
+            return jsonify({"error": "No shadow model running"}), 409
+        # Model shadow sudah dimuat dan hangat, jadi cukup di-swap.
+        _model_instance = shadow.model
+        model_state.update(
+            {
+                "path": shadow.model_path,
+                "loaded_at": datetime.now().isoformat(),
+                "reload_status": "idle",
+            }
+        )
+    finally:
+        _model_reload_lock.release()
+    logger.info(f"Shadow model {shadow.model_path} promoted to primary")
+    return jsonify({"status": "Shadow model promoted", "path": shadow.model_path})
+
+
+@app.route("/replay/<area>", methods=["GET"])
+@metrics.do_not_track()
+def replay_area(area):
+    area_id = area.upper()
+    if frame_archive is None:
+        return jsonify({"error": "Frame archive is disabled"}), 404
+    if area_id not in areas_data:
+        return jsonify({"error": f"Unknown area: {area}"}), 404
+    try:
+        start = parse_replay_time(request.args.get("start"))
+        end = parse_replay_time(request.args.get("end"))
+        speed = parse_replay_speed(request.args.get("speed", "1.0"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid replay parameter: {str(e)}"}), 400
+    return Response(
+        generate_replay_frames(area_id, start, end, speed),
+        mimetype="multipart/x-mixed-replace; boundary=frame",
+    )
+
+
+@app.route("/events", methods=["GET"])
+@metrics.do_not_track()
+def stream_events():
+    # NDJSON: ?after=<seq terakhir yang sudah diterima>&follow=0|1&area=<id>
+    # Saat follow, baris kosong = heartbeat (abaikan di sisi konsumen).
+    if event_journal is None:
+        return jsonify({"error": "Event journal is disabled"}), 404
+    try:
+        after = int(request.args.get("after", "0"))
+        if after < 0:
+            raise ValueError("after must be >= 0")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid events parameter: {str(e)}"}), 400
+    area_id = request.args.get("area", "").upper() or None
+    if area_id is not None and area_id not in areas_data:
+        return jsonify({"error": f"Unknown area: {area_id}"}), 404
+    if request.args.get("follow", "1") == "0":
+        events = event_journal.read_after(after)
+    else:
+        events = event_journal.follow(
+            after, heartbeat_interval=EVENTS_HEARTBEAT_SECONDS
+        )
+    first_seqs = event_journal.file_first_seqs()
+    return Response(
+        generate_event_lines(events, area_id),
+        mimetype="application/x-ndjson",
+        headers={
+            "X-Journal-First-Seq": str(first_seqs[0] if first_seqs else 1),
+            "X-Journal-Last-Seq": str(event_journal.flushed_seq),
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def generate_event_lines(events, area_id=None):
+    for event in events:
+        if event is None:
+            yield "\n"
+        elif area_id is None or event.get("area") == area_id:
+            yield json.dumps(event, separators=(",", ":")) + "\n"
+
+
+def upload_image_for_area(area_id):
+    if not request.data:
+        return jsonify({"error": "No image data provided"}), 400
+    try:
+        with admission_controller.admit(area_id):
+            result = process_image_for_area(area_id, request.data)
+        return jsonify(result)
+    except AdmissionRejected as e:
+        logger.warning(f"Area {area_id}: upload rejected ({e.reason})")
+        return (
+            jsonify({"error": "Server busy, retry later", "reason": e.reason}),
+            429,
+            {"Retry-After": str(e.retry_after)},
+        )
+    except Exception as e:
+        return jsonify({"error": f"Processing failed: {str(e)}"}), 500
+
+
 def get_detections_for_area(area_id):
+    refresh_connection_status(area_id)
     area_data = areas_data[area_id]
-    if area_data["last_frame_time"]:
-        time_diff = (datetime.now() - area_data["last_frame_time"]).total_seconds()
-        if time_diff > 10:
-            area_data["connection_status"] = False
     if not area_data["latest_detection"] or not area_data["latest_detection"].get(
         "detections"
     ):
@@ -300,7 +829,7 @@ def get_detections_for_area(area_id):
     high_confidence_cars = [
         d
         for d in area_data["latest_detection"]["detections"]
-        if d["class"] == "car" and d["confidence"] > 0.8
+        if d["class"] == "car" and d["confidence"] > CONFIDENCE_THRESHOLD
     ]
     car_count_high_conf = len(high_confidence_cars)
     return jsonify(
@@ -310,7 +839,7 @@ def get_detections_for_area(area_id):
             "total_detections_in_frame": len(
                 area_data["latest_detection"]["detections"]
             ),
-            "confidence_threshold": 0.8,
+            "confidence_threshold": CONFIDENCE_THRESHOLD,
             "connection_status": area_data["connection_status"],
             "last_update": area_data["last_frame_time"].isoformat()
             if area_data["last_frame_time"]
@@ -321,11 +850,8 @@ def get_detections_for_area(area_id):
 
 
 def get_status_for_area(area_id):
+    refresh_connection_status(area_id)
     area_data = areas_data[area_id]
-    if area_data["last_frame_time"]:
-        time_diff = (datetime.now() - area_data["last_frame_time"]).total_seconds()
-        if time_diff > 10:
-            area_data["connection_status"] = False
     return jsonify(
         {
             "connection_status": area_data["connection_status"],
@@ -339,11 +865,8 @@ def get_status_for_area(area_id):
 
 
 def get_area_detection_data(area_id):
+    refresh_connection_status(area_id)
     area_data = areas_data[area_id]
-    if area_data["last_frame_time"]:
-        time_diff = (datetime.now() - area_data["last_frame_time"]).total_seconds()
-        if time_diff > 10:
-            area_data["connection_status"] = False
     if not area_data["latest_detection"] or not area_data["latest_detection"].get(
         "detections"
     ):
@@ -355,7 +878,7 @@ def get_area_detection_data(area_id):
     high_confidence_cars = [
         d
         for d in area_data["latest_detection"]["detections"]
-        if d["class"] == "car" and d["confidence"] > 0.8
+        if d["class"] == "car" and d["confidence"] > CONFIDENCE_THRESHOLD
     ]
     return {
         "car_count": len(high_confidence_cars),
@@ -365,11 +888,8 @@ def get_area_detection_data(area_id):
 
 
 def get_status_data(area_id):
+    refresh_connection_status(area_id)
     area_data = areas_data[area_id]
-    if area_data["last_frame_time"]:
-        time_diff = (datetime.now() - area_data["last_frame_time"]).total_seconds()
-        if time_diff > 10:
-            area_data["connection_status"] = False
     return {
         "connection_status": area_data["connection_status"],
         "last_frame_time": area_data["last_frame_time"].isoformat()
@@ -379,44 +899,95 @@ def get_status_data(area_id):
     }
 
 
-def generate_frames_for_area(area_id):
-    area_data = areas_data[area_id]
-    while True:
-        with area_data["frame_lock"]:
-            if area_data["processed_frame"] is not None:
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n"
-                    + area_data["processed_frame"]
-                    + b"\r\n"
-                )
-            else:
-                placeholder = create_placeholder_image(area_id)
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n" + placeholder + b"\r\n"
-                )
-        time.sleep(0.06)
+def stream_feed_for_area(area_id, frame_generator):
+    # ?size=thumbnail|medium|full&fps=<maks fps>
+    rendition = request.args.get("size", "full")
+    if rendition not in RENDITIONS:
+        return (
+            jsonify(
+                {
+                    "error": f"Unknown size: {rendition}",
+                    "available_sizes": list(RENDITIONS),
+                }
+            ),
+            400,
+        )
+    max_fps = request.args.get("fps", type=float)
+    if "fps" in request.args and (max_fps is None or max_fps <= 0):
+        return jsonify({"error": "fps must be a positive number"}), 400
+    return Response(
+        frame_generator(area_id, rendition, max_fps),
+        mimetype="multipart/x-mixed-replace; boundary=frame",
+    )
+
+
+def get_placeholder_image(area_id):
+    if area_id not in _placeholder_images:
+        _placeholder_images[area_id] = create_placeholder_image(area_id)
+    return _placeholder_images[area_id]
 
 
-def generate_raw_frames_for_area(area_id):
+def generate_feed_frames(area_id, frame_key, rendition, interval):
     area_data = areas_data[area_id]
-    while True:
-        with area_data["frame_lock"]:
-            if area_data["latest_frame"] is not None:
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n"
-                    + area_data["latest_frame"]
-                    + b"\r\n"
-                )
-            else:
-                placeholder = create_placeholder_image(area_id)
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n" + placeholder + b"\r\n"
-                )
-        time.sleep(0.1)
+    with frame_pool.pin(area_id), rendition_cache.subscribe(
+        area_id, frame_key, rendition
+    ):
+        while True:
+            with area_data["frame_lock"]:
+                frame = area_data[frame_key]
+                version = area_data[f"{frame_key}_version"]
+            if frame is None:
+                frame, version = get_placeholder_image(area_id), "placeholder"
+            # Di-encode sekali per versi frame, dipakai bersama semua viewer.
+            frame = rendition_cache.get(area_id, frame_key, rendition, version, frame)
+            # Header, frame dan trailer dikirim terpisah: objek frame yang sama
+            # dipakai semua viewer tanpa disalin per klien.
+            yield FRAME_HEADER
+            yield frame
+            yield FRAME_TRAILER
+            time.sleep(interval)
+
+
+def generate_frames_for_area(area_id, rendition="full", max_fps=None):
+    interval = max(0.06, 1 / max_fps) if max_fps else 0.06
+    return generate_feed_frames(area_id, "processed_frame", rendition, interval)
+
+
+def generate_raw_frames_for_area(area_id, rendition="full", max_fps=None):
+    interval = max(0.1, 1 / max_fps) if max_fps else 0.1
+    return generate_feed_frames(area_id, "latest_frame", rendition, interval)
+
+
+def parse_replay_time(value):
+    # Epoch detik atau ISO 8601.
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def parse_replay_speed(value):
+    # "max" = tanpa jeda antar frame; selain itu harus angka positif dan finite.
+    if value == "max":
+        return math.inf
+    speed = float(value)
+    if not math.isfinite(speed) or speed <= 0:
+        raise ValueError(f"speed must be a positive number or 'max', got {value}")
+    return speed
+
+
+def generate_replay_frames(area_id, start, end, speed):
+    previous_timestamp = None
+    for timestamp, img_bytes, _ in frame_archive.iter_frames(area_id, start, end):
+        if previous_timestamp is not None and speed != math.inf:
+            gap = (timestamp - previous_timestamp) / speed
+            time.sleep(min(max(gap, 0), REPLAY_MAX_GAP_SECONDS))
+        previous_timestamp = timestamp
+        yield FRAME_HEADER
+        yield img_bytes
+        yield FRAME_TRAILER
 
 
 def create_placeholder_image(area_id):
@@ -481,7 +1052,33 @@ def custom_metrics_info():
                     "neopark_occupied_slots_area_a2",
                     "neopark_yolo_detection_confidence_score_histogram",
                     "neopark_yolo_car_detections_total",
+                    "neopark_archive_frames_written_total",
+                    "neopark_archive_frames_dropped_total",
+                    "neopark_archive_segments_deleted_total",
+                    "neopark_hard_examples_captured_total",
+                    "neopark_hard_examples_dropped_total",
+                    "neopark_inference_latency_seconds",
+                    "neopark_shadow_frames_total",
+                    "neopark_shadow_frames_skipped_total",
+                    "neopark_shadow_count_disagreements_total",
+                    "neopark_shadow_count_abs_diff",
+                    "neopark_admission_queue_depth",
+                    "neopark_admission_in_flight",
+                    "neopark_admission_admitted_total",
+                    "neopark_admission_rejected_total",
+                    "neopark_admission_service_share",
+                    "neopark_admission_wait_seconds",
+                    "neopark_rendition_encodes_total",
+                    "neopark_rendition_subscribers",
+                    "neopark_journal_events_total",
+                    "neopark_journal_last_seq",
+                    "neopark_frame_pool_bytes",
+                    "neopark_frame_pool_budget_bytes",
+                    "neopark_frame_pool_buffers",
+                    "neopark_frame_pool_evictions_total",
+                    "process_resident_memory_bytes",
                 ],
+                "runtime_settings": runtime_settings,
                 "metrics_endpoint": "/metrics",
                 "note": "Access /metrics endpoint for Prometheus scraping",
             }
@@ -491,6 +1088,20 @@ def custom_metrics_info():
 
 
 if __name__ == "__main__":
+    if MODEL_WATCH_INTERVAL > 0:
+        threading.Thread(
+            target=watch_model_file,
+            args=(MODEL_WATCH_INTERVAL,),
+            name="model-file-watch",
+            daemon=True,
+        ).start()
+    if event_journal is not None:
+        threading.Thread(
+            target=watch_connections,
+            args=(1.0,),
+            name="connection-watch",
+            daemon=True,
+        ).start()
     logger.info(
         "Starting Combined Car Detection Server with Prometheus metrics enabled on /metrics"
     )
@@ -0,0 +1,96 @@
+import io
+import threading
+from contextlib import contextmanager
+
+from PIL import Image
+from prometheus_client import Counter, Gauge
+
+# Nama rendition -> (lebar maks, tinggi maks, kualitas JPEG); None = frame asli.
+RENDITIONS = {
+    "thumbnail": (320, 240, 60),
+    "medium": (640, 480, 75),
+    "full": None,
+}
+
+rendition_encodes_total = Counter(
+    "neopark_rendition_encodes_total",
+    "Total number of preview rendition encodes",
+    ["rendition"],
+)
+rendition_subscribers = Gauge(
+    "neopark_rendition_subscribers",
+    "Number of active stream viewers per rendition",
+    ["area", "source", "rendition"],
+)
+
+
+def encode_rendition(frame_bytes, rendition):
+    max_width, max_height, quality = RENDITIONS[rendition]
+    img = Image.open(io.BytesIO(frame_bytes)).convert("RGB")
+    img.thumbnail((max_width, max_height))
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+class RenditionCache:
+    # Satu encode per (area, sumber, rendition, versi frame), dipakai bersama
+    # oleh semua viewer. Rendition tanpa viewer tidak pernah di-encode.
+    def __init__(self, pool=None):
+        self._lock = threading.Lock()
+        self._entries = {}
+        # FramePool opsional: hasil encode ikut dihitung dalam budget memori.
+        self._pool = pool
+
+    def _entry_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {
+                "lock": threading.Lock(),
+                "version": None,
+                "data": None,
+                "subscribers": 0,
+            }
+            self._entries[key] = entry
+        return entry
+
+    @contextmanager
+    def subscribe(self, area_id, source, rendition):
+        key = (area_id, source, rendition)
+        with self._lock:
+            entry = self._entry_locked(key)
+            entry["subscribers"] += 1
+            rendition_subscribers.labels(*key).set(entry["subscribers"])
+        try:
+            yield
+        finally:
+            with self._lock:
+                entry["subscribers"] -= 1
+                rendition_subscribers.labels(*key).set(entry["subscribers"])
+                if entry["subscribers"] == 0 and self._entries.get(key) is entry:
+                    # Tidak ada viewer: lepaskan hasil encode dari memori.
+                    del self._entries[key]
+                    if self._pool is not None:
+                        self._pool.discard(area_id, f"{source}:{rendition}")
+
+    def get(self, area_id, source, rendition, version, frame_bytes):
+        if RENDITIONS[rendition] is None:
+            return frame_bytes
+        with self._lock:
+            entry = self._entry_locked((area_id, source, rendition))
+        with entry["lock"]:
+            if entry["version"] != version:
+                entry["data"] = encode_rendition(frame_bytes, rendition)
+                if self._pool is not None:
+                    self._pool.put(area_id, f"{source}:{rendition}", entry["data"])
+                entry["version"] = version
+                rendition_encodes_total.labels(rendition=rendition).inc()
+            return entry["data"]
+
+    def active_renditions(self):
+        with self._lock:
+            return {
+                key: entry["subscribers"]
+                for key, entry in self._entries.items()
+                if entry["subscribers"]
+            }
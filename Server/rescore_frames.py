@@ -0,0 +1,356 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from detection import (
+    CONFIDENCE_THRESHOLD,
+    box_overlap,
+    confident_car_detections,
+    extract_car_candidates,
+    run_tiled_inference,
+)
+from frame_archive import FrameArchive
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg")
+DECODE_CHUNKSIZE = 4
+
+
+# --- Reader ---
+
+
+def iter_directory_records(root, area_id=None):
+    # Struktur default: <root>/<area>/*.jpg; deteksi lama opsional di <frame>.json.
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(IMAGE_SUFFIXES):
+                continue
+            path = os.path.join(dirpath, filename)
+            sidecar = os.path.splitext(path)[0] + ".json"
+            stored = None
+            if os.path.exists(sidecar):
+                with open(sidecar) as f:
+                    stored = json.load(f)
+            yield {
+                "area": area_id or os.path.basename(dirpath).upper(),
+                "timestamp": os.path.getmtime(path),
+                "source": path,
+                "path": path,
+                "stored": stored,
+            }
+
+
+def iter_archive_records(archive_root, areas=None, start=None, end=None):
+    archive = FrameArchive(archive_root)
+    for area_id in areas or archive.areas():
+        for timestamp, img_bytes, detection in archive.iter_frames(area_id, start, end):
+            yield {
+                "area": area_id,
+                "timestamp": timestamp,
+                "source": f"archive:{area_id}@{timestamp:.3f}",
+                "jpeg": img_bytes,
+                "stored": detection,
+            }
+
+
+# --- Decoder (dijalankan di worker process) ---
+
+
+def decode_record(record):
+    try:
+        if "jpeg" in record:
+            img = Image.open(io.BytesIO(record.pop("jpeg")))
+        else:
+            img = Image.open(record["path"])
+        # Ultralytics memperlakukan array numpy sebagai BGR.
+        frame = np.ascontiguousarray(np.asarray(img.convert("RGB"))[:, :, ::-1])
+        return record, frame, None
+    except Exception as e:
+        record.pop("jpeg", None)
+        return record, None, str(e)
+
+
+def _throttled(records, slots):
+    # Batasi frame yang sedang di-decode/di-batch supaya memori tetap konstan.
+    for record in records:
+        slots.acquire()
+        yield record
+
+
+# --- Perbandingan dengan deteksi tersimpan ---
+
+
+def compare_detections(new_detections, stored_detections, iou_threshold=0.5):
+    matched_stored = set()
+    matched = 0
+    for det in new_detections:
+        for index, stored in enumerate(stored_detections):
+            if index in matched_stored:
+                continue
+            if (
+                box_overlap(det["bounding_box"], stored["bounding_box"])
+                >= iou_threshold
+            ):
+                matched_stored.add(index)
+                matched += 1
+                break
+    return {
+        "matched": matched,
+        "added": len(new_detections) - matched,
+        "missing": len(stored_detections) - matched,
+    }
+
+
+# --- Writer ---
+
+
+class ResultWriter(threading.Thread):
+    def __init__(self, out_dir, queue_size=256):
+        super().__init__(name="rescore-writer", daemon=True)
+        self.out_dir = out_dir
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.area_stats = {}
+        self._timelines = {}
+        self._diff_file = None
+
+    def run(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._diff_file = open(os.path.join(self.out_dir, "diffs.ndjson"), "w")
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                self._write(*item)
+        finally:
+            self._diff_file.close()
+            for f, _ in self._timelines.values():
+                f.close()
+
+    def _timeline(self, area_id):
+        if area_id not in self._timelines:
+            f = open(os.path.join(self.out_dir, f"timeline_{area_id}.csv"), "w")
+            writer = csv.writer(f)
+            writer.writerow(["timestamp", "car_count", "stored_car_count", "source"])
+            self._timelines[area_id] = (f, writer)
+        return self._timelines[area_id][1]
+
+    def _write(self, record, detections):
+        area_id = record["area"]
+        stats = self.area_stats.setdefault(
+            area_id, {"frames": 0, "cars_total": 0, "diff_frames": 0}
+        )
+        stats["frames"] += 1
+        stats["cars_total"] += len(detections)
+
+        stored = record.get("stored")
+        stored_detections = stored.get("detections", []) if stored else None
+        stored_count = len(stored_detections) if stored is not None else ""
+        self._timeline(area_id).writerow(
+            [
+                f"{record['timestamp']:.3f}",
+                len(detections),
+                stored_count,
+                record["source"],
+            ]
+        )
+        if stored_detections is None:
+            return
+        comparison = compare_detections(detections, stored_detections)
+        if comparison["added"] or comparison["missing"]:
+            stats["diff_frames"] += 1
+            self._diff_file.write(
+                json.dumps(
+                    {
+                        "area": area_id,
+                        "timestamp": record["timestamp"],
+                        "source": record["source"],
+                        "car_count": len(detections),
+                        "stored_car_count": len(stored_detections),
+                        **comparison,
+                    }
+                )
+                + "\n"
+            )
+
+
+# --- Pipeline ---
+
+
+def rescore(
+    records,
+    model,
+    out_dir,
+    pool=None,
+    batch_size=16,
+    max_in_flight=256,
+    threshold=CONFIDENCE_THRESHOLD,
+    tiled_areas=(),
+    tile_options=None,
+    imgsz=None,
+):
+    # Slot harus cukup untuk satu batch penuh plus satu chunk decoder, kalau
+    # tidak reader dan loop inference saling menunggu.
+    slots = threading.BoundedSemaphore(
+        max(max_in_flight, batch_size + DECODE_CHUNKSIZE)
+    )
+    throttled = _throttled(records, slots)
+    if pool is not None:
+        decoded = pool.imap(decode_record, throttled, chunksize=DECODE_CHUNKSIZE)
+    else:
+        decoded = map(decode_record, throttled)
+
+    writer = ResultWriter(out_dir)
+    writer.start()
+    predict_kwargs = {"verbose": False}
+    if imgsz:
+        predict_kwargs["imgsz"] = imgsz
+
+    stats = {"frames": 0, "decode_errors": 0, "inference_seconds": 0.0}
+    started = time.perf_counter()
+
+    def infer(batch):
+        inference_started = time.perf_counter()
+        results = model([frame for _, frame in batch], **predict_kwargs)
+        stats["inference_seconds"] += time.perf_counter() - inference_started
+        for (record, _), result in zip(batch, results):
+            candidates = extract_car_candidates([result], model.names)
+            emit(record, candidates)
+
+    def emit(record, candidates):
+        detections = confident_car_detections(candidates, record["area"], threshold)
+        writer.queue.put((record, detections))
+        stats["frames"] += 1
+        slots.release()
+
+    batch = []
+    for record, frame, error in decoded:
+        if error is not None:
+            logger.warning(f"Skipping {record['source']}: {error}")
+            stats["decode_errors"] += 1
+            slots.release()
+            continue
+        if record["area"] in tiled_areas:
+            inference_started = time.perf_counter()
+            candidates = run_tiled_inference(
+                model, Image.fromarray(frame[:, :, ::-1]), **(tile_options or {})
+            )
+            stats["inference_seconds"] += time.perf_counter() - inference_started
+            emit(record, candidates)
+            continue
+        batch.append((record, frame))
+        if len(batch) >= batch_size:
+            infer(batch)
+            batch = []
+    if batch:
+        infer(batch)
+
+    writer.queue.put(None)
+    writer.join()
+
+    elapsed = time.perf_counter() - started
+    stats.update(
+        {
+            "elapsed_seconds": elapsed,
+            "frames_per_second": stats["frames"] / elapsed if elapsed else 0.0,
+            "inference_frames_per_second": (
+                stats["frames"] / stats["inference_seconds"]
+                if stats["inference_seconds"]
+                else 0.0
+            ),
+            "areas": {
+                area_id: {
+                    **area_stats,
+                    "mean_car_count": area_stats["cars_total"] / area_stats["frames"],
+                }
+                for area_id, area_stats in writer.area_stats.items()
+            },
+        }
+    )
+    with open(os.path.join(out_dir, "stats.json"), "w") as f:
+        json.dump(stats, f, indent=2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-score frame arsip/folder JPEG dengan model YOLO baru."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images", help="Folder JPEG (<root>/<area>/*.jpg)")
+    source.add_argument("--archive", help="Root NEOPARK_ARCHIVE_DIR")
+    parser.add_argument("--area", help="Paksa area untuk semua frame (mode --images)")
+    parser.add_argument("--areas", help="Daftar area arsip, mis. A1,A2")
+    parser.add_argument("--start", type=float, help="Epoch awal (mode --archive)")
+    parser.add_argument("--end", type=float, help="Epoch akhir (mode --archive)")
+    parser.add_argument("--model", default="fine-best.pt")
+    parser.add_argument("--out", default="rescore_output")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--imgsz", type=int)
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(1, (os.cpu_count() or 2) - 1),
+        help="Jumlah proses decoder (default: semua core kecuali satu)",
+    )
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--tiled-areas", default="")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--tile-overlap", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.images:
+        records = iter_directory_records(args.images, args.area)
+    else:
+        areas = args.areas.split(",") if args.areas else None
+        records = iter_archive_records(args.archive, areas, args.start, args.end)
+
+    # Pool dibuat sebelum model dimuat supaya worker tidak mewarisi thread torch.
+    pool = multiprocessing.Pool(args.workers) if args.workers > 0 else None
+    try:
+        from ultralytics import YOLO
+
+        model = YOLO(args.model)
+        stats = rescore(
+            records,
+            model,
+            args.out,
+            pool=pool,
+            batch_size=args.batch_size,
+            max_in_flight=args.max_in_flight,
+            threshold=args.threshold,
+            tiled_areas={
+                a.strip().upper() for a in args.tiled_areas.split(",") if a.strip()
+            },
+            tile_options={
+                "tile_size": args.tile_size,
+                "overlap": args.tile_overlap,
+                "batch_size": args.batch_size,
+            },
+            imgsz=args.imgsz,
+        )
+    finally:
+        if pool is not None:
+            pool.terminate()
+    logger.info(
+        f"Re-scored {stats['frames']} frames in {stats['elapsed_seconds']:.1f}s "
+        f"({stats['frames_per_second']:.1f} fps)"
+    )
+
+
+if __name__ == "__main__":
+    main()
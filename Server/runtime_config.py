@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Kunci yang ditulis tune_runtime.py dan dibaca server saat startup.
+RUNTIME_CONFIG_KEYS = {
+    "torch_threads": int,
+    "interop_threads": int,
+    "workers": int,
+    "batch_size": int,
+    "imgsz": int,
+}
+
+
+def load_runtime_config(path):
+    with open(path) as f:
+        raw = json.load(f)
+    config = {}
+    for key, cast in RUNTIME_CONFIG_KEYS.items():
+        if raw.get(key) is not None:
+            value = cast(raw[key])
+            if value <= 0:
+                raise ValueError(f"{key} must be positive, got {value}")
+            config[key] = value
+    if raw.get("cpu_affinity"):
+        config["cpu_affinity"] = sorted(int(cpu) for cpu in raw["cpu_affinity"])
+    return config
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def apply_runtime_config(config):
+    # Diterapkan sebelum model dimuat; mengembalikan nilai yang benar-benar aktif.
+    import torch
+
+    if "cpu_affinity" in config:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, config["cpu_affinity"])
+        else:
+            logger.warning("CPU affinity is not supported on this platform")
+    if "torch_threads" in config:
+        torch.set_num_threads(config["torch_threads"])
+    if "interop_threads" in config:
+        try:
+            torch.set_num_interop_threads(config["interop_threads"])
+        except RuntimeError as e:
+            # Hanya bisa di-set sekali, sebelum ada kerja paralel inter-op.
+            logger.warning(f"Cannot set torch interop threads: {e}")
+    return {
+        "torch_threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+        "cpu_affinity": available_cpus(),
+    }
@@ -0,0 +1,97 @@
+import logging
+import queue
+import random
+import threading
+import time
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+inference_latency_seconds = Histogram(
+    "neopark_inference_latency_seconds",
+    "Model inference latency per frame",
+    ["model"],
+    buckets=(0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+shadow_frames_total = Counter(
+    "neopark_shadow_frames_total",
+    "Total number of frames evaluated by the shadow model",
+    ["area"],
+)
+shadow_frames_skipped_total = Counter(
+    "neopark_shadow_frames_skipped_total",
+    "Total number of sampled frames skipped because the shadow queue was full",
+    ["area"],
+)
+shadow_count_disagreements_total = Counter(
+    "neopark_shadow_count_disagreements_total",
+    "Total number of frames where shadow and primary car counts differ",
+    ["area"],
+)
+shadow_count_abs_diff = Histogram(
+    "neopark_shadow_count_abs_diff",
+    "Absolute difference between shadow and primary car counts",
+    ["area"],
+    buckets=(0, 1, 2, 3, 5, 10),
+)
+
+
+class ShadowEvaluator:
+    # Menjalankan model kandidat pada sebagian frame, di luar request path.
+    def __init__(self, model, model_path, count_cars, sample_rate=0.1, queue_size=4):
+        self.model = model
+        self.model_path = model_path
+        self.count_cars = count_cars
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._worker_loop, name="shadow-model", daemon=True
+        )
+        self.stats = {"frames": 0, "disagreements": 0, "skipped": 0}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def submit(self, area_id, img, primary_count):
+        if random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((area_id, img, primary_count))
+            return True
+        except queue.Full:
+            self.stats["skipped"] += 1
+            shadow_frames_skipped_total.labels(area=area_id).inc()
+            return False
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                area_id, img, primary_count = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.evaluate(area_id, img, primary_count)
+            except Exception as e:
+                logger.error(f"Shadow model inference failed for Area {area_id}: {e}")
+
+    def evaluate(self, area_id, img, primary_count):
+        started = time.perf_counter()
+        shadow_count = self.count_cars(area_id, self.model, img)
+        inference_latency_seconds.labels(model="shadow").observe(
+            time.perf_counter() - started
+        )
+        diff = abs(shadow_count - primary_count)
+        self.stats["frames"] += 1
+        shadow_frames_total.labels(area=area_id).inc()
+        shadow_count_abs_diff.labels(area=area_id).observe(diff)
+        if diff:
+            self.stats["disagreements"] += 1
+            shadow_count_disagreements_total.labels(area=area_id).inc()
+        return shadow_count
@@ -0,0 +1,312 @@
+import bisect
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from flask import Flask, Response, jsonify, request
+from prometheus_client import Counter, Histogram
+from prometheus_flask_exporter import PrometheusMetrics
+from requests.adapters import HTTPAdapter
+
+from detection import CONFIDENCE_THRESHOLD
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Header hop-by-hop yang tidak boleh diteruskan oleh proxy.
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+    "content-encoding",
+    "content-length",
+}
+STREAMING_PATHS = {"video_feed", "raw_feed"}
+
+shard_requests_failed_total = Counter(
+    "neopark_shard_requests_failed_total",
+    "Total number of failed or timed out requests to inference shards",
+    ["shard"],
+)
+shard_fanout_latency_seconds = Histogram(
+    "neopark_shard_fanout_latency_seconds",
+    "Latency of combined fan-out requests across all shards",
+    ["endpoint"],
+)
+
+
+def parse_shards(value):
+    # "node1=http://host1:5000,node2=http://host2:5000" atau daftar URL saja.
+    shards = {}
+    for index, item in enumerate(v.strip() for v in value.split(",") if v.strip()):
+        name, _, url = item.rpartition("=")
+        shards[name or f"shard{index + 1}"] = url.rstrip("/")
+    return shards
+
+
+def parse_area_map(value):
+    mapping = {}
+    for item in (v.strip() for v in value.split(",") if v.strip()):
+        area_id, _, shard = item.partition("=")
+        mapping[area_id.strip().upper()] = shard.strip()
+    return mapping
+
+
+class HashRing:
+    # Consistent hashing: menambah node hanya memindahkan sebagian kecil area.
+    def __init__(self, nodes, replicas=100):
+        self._ring = sorted(
+            (self._hash(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(value):
+        return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+    def node_for(self, key):
+        if not self._ring:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class ShardRouter:
+    def __init__(self, shards, areas, static_map=None, timeout=2.0, pool_size=16):
+        self.shards = dict(shards)
+        self.areas = [area_id.upper() for area_id in areas]
+        self.static_map = dict(static_map or {})
+        unknown = set(self.static_map.values()) - set(self.shards)
+        if unknown:
+            raise ValueError(f"Static shard map refers to unknown shards: {unknown}")
+        self.timeout = timeout
+        self.ring = HashRing(sorted(self.shards))
+        # Satu session bersama: koneksi keep-alive ke setiap shard dipakai ulang.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max(1, len(self.shards)), pool_maxsize=pool_size
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Cukup worker untuk pool_size request /combined/* bersamaan per shard.
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self.shards)) * pool_size,
+            thread_name_prefix="shard-fanout",
+        )
+
+    def owner(self, area_id):
+        area_id = area_id.upper()
+        return self.static_map.get(area_id) or self.ring.node_for(area_id)
+
+    def assignments(self):
+        return {area_id: self.owner(area_id) for area_id in self.areas}
+
+    def url_for(self, shard, path):
+        return f"{self.shards[shard]}/{path.lstrip('/')}"
+
+    def _get_json(self, shard, path):
+        response = self.session.get(self.url_for(shard, path), timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def fan_out(self, path):
+        # Hanya shard yang memiliki area yang ditanya; hasil parsial jika ada yang gagal.
+        owners = sorted(set(self.assignments().values()))
+        limit = self.timeout * 2
+        submitted = time.monotonic()
+        started = {}
+
+        def fetch(shard):
+            started[shard] = time.monotonic()
+            return self._get_json(shard, path)
+
+        def deadline(shard):
+            # Jam timeout mulai saat task berjalan, bukan saat masuk antrean
+            # executor; task yang antre terlalu lama tetap dibatasi.
+            if shard in started:
+                return started[shard] + limit
+            return submitted + 2 * limit
+
+        futures = {shard: self._executor.submit(fetch, shard) for shard in owners}
+        pending = dict(futures)
+        while pending:
+            now = time.monotonic()
+            for shard in [s for s in pending if deadline(s) <= now]:
+                del pending[shard]
+            if not pending:
+                break
+            done, _ = wait(
+                pending.values(),
+                timeout=min(deadline(s) for s in pending) - now,
+                return_when=FIRST_COMPLETED,
+            )
+            for shard in [s for s, f in pending.items() if f in done]:
+                del pending[shard]
+
+        results, errors = {}, {}
+        for shard, future in futures.items():
+            if not future.done():
+                future.cancel()
+                errors[shard] = "timeout"
+            elif future.exception() is not None:
+                errors[shard] = str(future.exception())
+            else:
+                results[shard] = future.result()
+        for shard in errors:
+            shard_requests_failed_total.labels(shard=shard).inc()
+            logger.warning(f"Shard {shard} failed for {path}: {errors[shard]}")
+        return results, errors
+
+
+def create_coordinator_app(router, registry=None):
+    app = Flask(__name__)
+    app.config["SHARD_ROUTER"] = router
+    metrics = PrometheusMetrics(app, group_by="endpoint", registry=registry)
+
+    def collect_areas(path):
+        started = time.perf_counter()
+        results, errors = router.fan_out(path)
+        shard_fanout_latency_seconds.labels(endpoint=path).observe(
+            time.perf_counter() - started
+        )
+        areas, missing = {}, []
+        for area_id, shard in router.assignments().items():
+            key = f"area_{area_id.lower()}"
+            if shard in results and key in results[shard]:
+                areas[key] = results[shard][key]
+            else:
+                missing.append(area_id)
+        return areas, missing, errors
+
+    @app.route("/combined/get_detections", methods=["GET"])
+    def combined_detections():
+        areas, missing, errors = collect_areas("/combined/get_detections")
+        return jsonify(
+            {
+                "total_cars": sum(area["car_count"] for area in areas.values()),
+                **areas,
+                "confidence_threshold": CONFIDENCE_THRESHOLD,
+                "partial": bool(missing),
+                "missing_areas": missing,
+                "shard_errors": errors,
+            }
+        )
+
+    @app.route("/combined/status", methods=["GET"])
+    def combined_status():
+        areas, missing, errors = collect_areas("/combined/status")
+        return jsonify(
+            {
+                **areas,
+                "partial": bool(missing),
+                "missing_areas": missing,
+                "shard_errors": errors,
+            }
+        )
+
+    @app.route("/shards", methods=["GET"])
+    def shard_assignments():
+        return jsonify({"shards": router.shards, "assignments": router.assignments()})
+
+    @app.route("/health", methods=["GET"])
+    @metrics.do_not_track()
+    def health_check():
+        return jsonify({"status": "healthy", "service": "neopark-coordinator"})
+
+    @app.route("/<area>/<action>", methods=["GET", "POST"])
+    @metrics.do_not_track()
+    def proxy_area(area, action):
+        return proxy_to_owner(area, f"/{area}/{action}")
+
+    @app.route("/replay/<area>", methods=["GET"])
+    @metrics.do_not_track()
+    def proxy_replay(area):
+        return proxy_to_owner(area, f"/replay/{area}")
+
+    def proxy_to_owner(area, path):
+        if area.upper() not in router.areas:
+            return jsonify({"error": f"Unknown area: {area}"}), 404
+        shard = router.owner(area)
+        streaming = path.rsplit("/", 1)[-1] in STREAMING_PATHS or path.startswith(
+            "/replay/"
+        )
+        headers = {
+            key: value
+            for key, value in request.headers.items()
+            if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() != "host"
+        }
+        try:
+            upstream = router.session.request(
+                request.method,
+                router.url_for(shard, path),
+                params=request.args,
+                data=request.get_data() if request.method == "POST" else None,
+                headers=headers,
+                stream=streaming,
+                timeout=(router.timeout, None if streaming else router.timeout * 5),
+            )
+        except requests.RequestException as e:
+            shard_requests_failed_total.labels(shard=shard).inc()
+            return jsonify({"error": f"Shard {shard} unavailable: {str(e)}"}), 502
+        response_headers = [
+            (key, value)
+            for key, value in upstream.headers.items()
+            if key.lower() not in HOP_BY_HOP_HEADERS
+        ]
+        if streaming:
+            response = Response(
+                upstream.iter_content(chunk_size=64 * 1024),
+                status=upstream.status_code,
+                headers=response_headers,
+            )
+            # Koneksi ke shard dilepas begitu klien selesai atau putus.
+            response.call_on_close(upstream.close)
+            return response
+        return Response(
+            upstream.content, status=upstream.status_code, headers=response_headers
+        )
+
+    @app.after_request
+    def after_request(response):
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add(
+            "Access-Control-Allow-Headers", "Content-Type,Authorization"
+        )
+        response.headers.add("Access-Control-Allow-Methods", "GET,PUT,POST,DELETE")
+        return response
+
+    return app
+
+
+def create_router_from_env():
+    return ShardRouter(
+        parse_shards(os.environ.get("NEOPARK_SHARDS", "http://localhost:5000")),
+        [
+            a.strip()
+            for a in os.environ.get("NEOPARK_AREAS", "A1,A2").split(",")
+            if a.strip()
+        ],
+        static_map=parse_area_map(os.environ.get("NEOPARK_SHARD_MAP", "")),
+        timeout=float(os.environ.get("NEOPARK_SHARD_TIMEOUT", "2.0")),
+    )
+
+
+if __name__ == "__main__":
+    router = create_router_from_env()
+    logger.info(f"Starting shard coordinator, assignments: {router.assignments()}")
+    create_coordinator_app(router).run(
+        host="0.0.0.0",
+        port=int(os.environ.get("NEOPARK_COORDINATOR_PORT", "5000")),
+        threaded=True,
+        debug=False,
+    )
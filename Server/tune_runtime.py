@@ -0,0 +1,264 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import statistics
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+from detection import (
+    extract_car_candidates,
+    run_tiled_inference,
+    validate_tile_settings,
+)
+from runtime_config import apply_runtime_config, available_cpus
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+PINNING_MODES = ("none", "process")
+
+
+def parse_list(value, cast=str):
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def process_cpu_affinity(cpus, workers, threads, pinning):
+    # process: seluruh proses dipin ke workers * threads core pertama, sama
+    # seperti cpu_affinity yang diterapkan server saat startup. None jika
+    # tanpa pinning atau kombinasi tidak muat di core yang tersedia.
+    if pinning == "none" or workers * threads > len(cpus):
+        return None
+    return cpus[: workers * threads]
+
+
+def candidate_configs(threads, workers, pinning, batch_sizes, imgsz, cpus):
+    for t, w, p, b, s in itertools.product(
+        threads, workers, pinning, batch_sizes, imgsz
+    ):
+        cpu_affinity = process_cpu_affinity(cpus, w, t, p)
+        if p != "none" and cpu_affinity is None:
+            continue  # Tidak muat di core yang tersedia.
+        yield {
+            "torch_threads": t,
+            "workers": w,
+            "pinning": p,
+            "batch_size": b,
+            "imgsz": s,
+            "cpu_affinity": cpu_affinity,
+        }
+
+
+def run_candidate(
+    candidate,
+    model_path,
+    image_paths,
+    frames_per_worker,
+    warmup,
+    interop,
+    tile_options=None,
+):
+    # Dijalankan di proses baru: thread torch dan affinity tidak bocor antar kandidat.
+    # Diterapkan lewat jalur yang sama dengan startup server.
+    from ultralytics import YOLO
+
+    runtime_config = {
+        "torch_threads": candidate["torch_threads"],
+        "interop_threads": interop,
+    }
+    if candidate["cpu_affinity"]:
+        runtime_config["cpu_affinity"] = candidate["cpu_affinity"]
+    apply_runtime_config(runtime_config)
+    model = YOLO(model_path)
+    images = [Image.open(p).convert("RGB") for p in image_paths]
+    predict_kwargs = {"imgsz": candidate["imgsz"], "verbose": False}
+
+    def infer(img):
+        # Jalur yang sama dengan run_inference_for_area: satu upload per panggilan;
+        # batch hanya berlaku untuk tile dalam satu frame.
+        if tile_options is None:
+            return extract_car_candidates(model(img, **predict_kwargs), model.names)
+        return run_tiled_inference(
+            model,
+            img,
+            batch_size=candidate["batch_size"],
+            predict_kwargs=predict_kwargs,
+            **tile_options,
+        )
+
+    for img in images[:warmup]:
+        infer(img)
+
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def worker(index):
+        for done in range(frames_per_worker):
+            img = images[(index + done) % len(images)]
+            start = time.perf_counter()
+            infer(img)
+            elapsed = (time.perf_counter() - start) * 1000
+            with latencies_lock:
+                latencies.append(elapsed)
+
+    # Satu model dipakai bersama oleh semua worker, sama seperti di server.
+    workers = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(candidate["workers"])
+    ]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - started
+    return {
+        **candidate,
+        "frames": len(latencies),
+        "throughput_fps": len(latencies) / wall,
+        "latency_ms_mean": statistics.mean(latencies),
+        "latency_ms_p50": percentile(latencies, 50),
+        "latency_ms_p99": percentile(latencies, 99),
+    }
+
+
+def select_config(results, slo_ms):
+    # Throughput tertinggi yang p99-nya masih dalam SLO; seri -> core lebih sedikit.
+    meeting = [r for r in results if r["latency_ms_p99"] <= slo_ms]
+    if meeting:
+        best = max(
+            meeting,
+            key=lambda r: (r["throughput_fps"], -r["torch_threads"] * r["workers"]),
+        )
+    else:
+        best = min(results, key=lambda r: r["latency_ms_p99"])
+    return {**best, "meets_slo": bool(meeting)}
+
+
+def build_runtime_config(best, model_path, slo_ms, interop):
+    config = {
+        "model": model_path,
+        "slo_ms_p99": slo_ms,
+        "meets_slo": best["meets_slo"],
+        "torch_threads": best["torch_threads"],
+        "interop_threads": interop,
+        "workers": best["workers"],
+        "pinning": best["pinning"],
+        "cpu_affinity": best["cpu_affinity"],
+        "imgsz": best["imgsz"],
+        "measured": {
+            key: best[key]
+            for key in ("throughput_fps", "latency_ms_p50", "latency_ms_p99")
+        },
+        "tuned_at": datetime.now().isoformat(),
+    }
+    if best["batch_size"] is not None:
+        # Hanya diukur dengan --tiled; dipakai server sebagai batch tile.
+        config["batch_size"] = best["batch_size"]
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cari thread torch, worker, CPU pinning, batch tile dan imgsz "
+        "terbaik untuk SLO latency."
+    )
+    parser.add_argument("--model", default="fine-best.pt")
+    parser.add_argument("--images", required=True, help="Folder sampel frame kamera")
+    parser.add_argument(
+        "--slo-ms", type=float, required=True, help="Target p99 latency"
+    )
+    parser.add_argument("--threads", default="1,2,4")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--pinning", default="none,process")
+    parser.add_argument(
+        "--tiled",
+        action="store_true",
+        help="Ukur tiled inference (NEOPARK_TILED_AREAS) alih-alih full frame",
+    )
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument(
+        "--batch-sizes", default="8", help="Batch tile per frame (hanya dengan --tiled)"
+    )
+    parser.add_argument("--imgsz", default="640")
+    parser.add_argument("--interop-threads", type=int, default=1)
+    parser.add_argument("--frames-per-worker", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--out", default="runtime_config.json")
+    args = parser.parse_args()
+
+    image_paths = sorted(
+        str(p)
+        for p in Path(args.images).iterdir()
+        if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if not image_paths:
+        parser.error(f"Tidak ada gambar di {args.images}")
+    pinning = parse_list(args.pinning)
+    unknown = set(pinning) - set(PINNING_MODES)
+    if unknown:
+        parser.error(f"Mode pinning tidak dikenal: {sorted(unknown)}")
+
+    candidates = list(
+        candidate_configs(
+            parse_list(args.threads, int),
+            parse_list(args.workers, int),
+            pinning,
+            parse_list(args.batch_sizes, int) if args.tiled else [None],
+            parse_list(args.imgsz, int),
+            available_cpus(),
+        )
+    )
+    if not candidates:
+        parser.error("Tidak ada kombinasi yang muat di CPU yang tersedia")
+
+    tile_options = None
+    if args.tiled:
+        try:
+            for batch_size in parse_list(args.batch_sizes, int):
+                validate_tile_settings(args.tile_size, args.overlap, batch_size)
+        except ValueError as e:
+            parser.error(str(e))
+        tile_options = {"tile_size": args.tile_size, "overlap": args.overlap}
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for candidate in candidates:
+        with context.Pool(1) as pool:
+            result = pool.apply(
+                run_candidate,
+                (
+                    candidate,
+                    args.model,
+                    image_paths,
+                    args.frames_per_worker,
+                    args.warmup,
+                    args.interop_threads,
+                    tile_options,
+                ),
+            )
+        print(json.dumps(result))
+        results.append(result)
+
+    best = select_config(results, args.slo_ms)
+    config = build_runtime_config(best, args.model, args.slo_ms, args.interop_threads)
+    Path(args.out).write_text(json.dumps(config, indent=2) + "\n")
+    if not best["meets_slo"]:
+        print(
+            f"Tidak ada kombinasi dengan p99 <= {args.slo_ms} ms; dipilih p99 terendah."
+        )
+    print(f"Konfigurasi ditulis ke {args.out}; jalankan server dengan")
+    print(f"    NEOPARK_RUNTIME_CONFIG={Path(args.out).resolve()}")
+
+
+if __name__ == "__main__":
+    main()
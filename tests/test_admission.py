@@ -0,0 +1,137 @@
+# tests/test_admission.py
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def _wait_for_queue(controller, depth, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while len(controller._waiting) < depth:
+        assert time.monotonic() < deadline, "waiter never queued"
+        time.sleep(0.005)
+
+
+def _queue_waiters(controller, areas, served):
+    threads = []
+    for area_id in areas:
+
+        def worker(area_id=area_id):
+            with controller.admit(area_id):
+                served.append(area_id)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        threads.append(thread)
+        _wait_for_queue(controller, len(threads))
+    return threads
+
+
+def test_admits_immediately_under_capacity():
+    controller = AdmissionController(capacity=2)
+    with controller.admit("A1"), controller.admit("A2"):
+        assert controller._active == 2
+    assert controller._active == 0
+    assert controller.admitted == {"A1": 1, "A2": 1}
+
+
+def test_rejects_with_retry_after_when_queue_full():
+    controller = AdmissionController(capacity=1, max_queue=0)
+    with controller.admit("A1"):
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit("A2"):
+                pass
+    assert excinfo.value.reason == "queue_full"
+    assert excinfo.value.retry_after >= 1
+
+
+def test_higher_priority_area_served_first():
+    controller = AdmissionController(capacity=1, priorities={"A1": 0, "A2": 1})
+    served = []
+    with controller.admit("HOLD"):
+        threads = _queue_waiters(controller, ["A2", "A2", "A1"], served)
+    for thread in threads:
+        thread.join()
+    assert served == ["A1", "A2", "A2"]
+
+
+def test_weighted_fair_share_between_areas():
+    controller = AdmissionController(capacity=1, weights={"A1": 3, "A2": 1})
+    served = []
+    with controller.admit("HOLD"):
+        threads = _queue_waiters(controller, ["A2"] * 4 + ["A1"] * 4, served)
+    for thread in threads:
+        thread.join()
+    assert served[:4].count("A1") == 3
+    assert sorted(served) == ["A1"] * 4 + ["A2"] * 4
+
+
+@pytest.mark.parametrize("weights", [{"A1": 0}, {"A1": -1.5}])
+def test_rejects_non_positive_area_weights(weights):
+    with pytest.raises(ValueError):
+        AdmissionController(weights=weights)
+
+
+def test_drops_frames_past_deadline():
+    controller = AdmissionController(capacity=1, deadline_seconds=0.05)
+    with controller.admit("A1"):
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit("A2"):
+                pass
+    assert excinfo.value.reason == "deadline"
+    assert controller._waiting == []
+
+
+def test_full_queue_evicts_lowest_priority_waiter_for_better_arrival():
+    controller = AdmissionController(
+        capacity=1, max_queue=2, priorities={"LOT": 5, "GATE": 0}
+    )
+    served, rejected = [], []
+
+    def worker(area_id):
+        try:
+            with controller.admit(area_id):
+                served.append(area_id)
+        except AdmissionRejected as e:
+            rejected.append((area_id, e.reason))
+
+    with controller.admit("HOLD"):
+        threads = []
+        for depth, area_id in enumerate(["LOT", "LOT", "GATE"], start=1):
+            threads.append(threading.Thread(target=worker, args=(area_id,)))
+            threads[-1].start()
+            _wait_for_queue(controller, min(depth, 2))
+        threads[1].join(2.0)
+        assert rejected == [("LOT", "queue_full")]
+        assert [ticket[0] for ticket in controller._waiting] == [5, 0]
+    for thread in threads:
+        thread.join()
+    assert served == ["GATE", "LOT"]
+
+
+def test_full_queue_rejects_arrival_without_better_priority():
+    controller = AdmissionController(capacity=1, max_queue=1, priorities={"A1": 0})
+    with controller.admit("HOLD"):
+        threads = _queue_waiters(controller, ["A1"], [])
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit("A2"):
+                pass
+    for thread in threads:
+        thread.join()
+    assert excinfo.value.reason == "queue_full"
+
+
+@pytest.mark.usefixtures("clean_areas_data_fixture")
+def test_upload_returns_429_with_retry_after_when_rejected(client):
+    with patch(
+        "neopark_server.admission_controller.admit",
+        side_effect=AdmissionRejected("A1", "queue_full", 3),
+    ), patch("neopark_server.process_image_for_area") as mock_process:
+        response = client.post("/a1/upload", data=b"jpeg")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    assert response.json["reason"] == "queue_full"
+    mock_process.assert_not_called()
@@ -0,0 +1,182 @@
+# tests/test_detection.py
+import io
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from detection import (
+    extract_car_candidates,
+    non_max_suppression,
+    run_tiled_inference,
+    tile_windows,
+    validate_tile_settings,
+)
+
+
+class FakeBox:
+    def __init__(self, cls_id, conf, xyxy):
+        self.cls = np.array([cls_id])
+        self.conf = np.array([conf])
+        self.xyxy = np.array([xyxy], dtype=float)
+
+
+class FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class FakeTileModel:
+    # Satu mobil di koordinat global; hanya dilaporkan oleh tile yang memuatnya penuh.
+    names = {0: "car", 1: "person"}
+
+    def __init__(self, car_box, conf=0.9):
+        self.car_box = car_box
+        self.conf = conf
+        self.batches = []
+
+    def __call__(self, imgs):
+        self.batches.append(len(imgs))
+        return [FakeResult(self._boxes_for(img)) for img in imgs]
+
+    def _boxes_for(self, img):
+        origin = getattr(img, "tile_origin", (0, 0))
+        x1, y1, x2, y2 = self.car_box
+        ox, oy = origin
+        w, h = img.size
+        if x1 >= ox and y1 >= oy and x2 <= ox + w and y2 <= oy + h:
+            return [FakeBox(0, self.conf, [x1 - ox, y1 - oy, x2 - ox, y2 - oy])]
+        return []
+
+
+class TrackingImage:
+    # Bungkus PIL.Image supaya crop() mengingat posisi tile di frame asli.
+    def __init__(self, img, origin=(0, 0)):
+        self._img = img
+        self.tile_origin = origin
+        self.size = img.size
+
+    def crop(self, box):
+        return TrackingImage(self._img.crop(box), (box[0], box[1]))
+
+
+def test_tile_windows_cover_frame_with_overlap():
+    windows = tile_windows(1920, 1080, 640, 0.25)
+    assert windows[0] == (0, 0, 640, 640)
+    assert max(w[2] for w in windows) == 1920
+    assert max(w[3] for w in windows) == 1080
+    assert all(w[2] - w[0] == 640 and w[3] - w[1] == 640 for w in windows)
+
+
+def test_tile_windows_small_frame_single_tile():
+    assert tile_windows(320, 240, 640, 0.2) == [(0, 0, 320, 240)]
+
+
+@pytest.mark.parametrize(
+    "tile_size, overlap, batch_size",
+    [(0, 0.2, 8), (640, 1.0, 8), (640, -0.1, 8), (640, 0.2, 0)],
+)
+def test_validate_tile_settings_rejects_invalid_values(tile_size, overlap, batch_size):
+    with pytest.raises(ValueError):
+        validate_tile_settings(tile_size, overlap, batch_size)
+
+
+def test_extract_car_candidates_applies_offset_and_filters_class():
+    results = [
+        FakeResult([FakeBox(0, 0.5, [1, 2, 3, 4]), FakeBox(1, 0.9, [5, 6, 7, 8])])
+    ]
+    candidates = extract_car_candidates(results, FakeTileModel.names, (100, 50))
+    assert candidates == [
+        {"class": "car", "confidence": 0.5, "bounding_box": [101, 52, 103, 54]}
+    ]
+
+
+def test_non_max_suppression_ios_drops_partial_border_box():
+    full = {"class": "car", "confidence": 0.9, "bounding_box": [600, 100, 700, 160]}
+    partial = {"class": "car", "confidence": 0.6, "bounding_box": [600, 100, 640, 160]}
+    other = {"class": "car", "confidence": 0.85, "bounding_box": [10, 10, 50, 50]}
+    kept = non_max_suppression([partial, full, other], 0.6, metric="ios")
+    assert kept == [full, other]
+
+
+def test_run_tiled_inference_batches_tiles_and_merges_duplicates():
+    frame = TrackingImage(Image.new("RGB", (1280, 720)))
+    model = FakeTileModel(car_box=(500, 300, 560, 340))
+    detections = run_tiled_inference(
+        model, frame, tile_size=640, overlap=0.5, batch_size=4
+    )
+    tiles = len(tile_windows(1280, 720, 640, 0.5)) + 1
+    assert sum(model.batches) == tiles
+    assert max(model.batches) <= 4
+    assert len(detections) == 1
+    assert detections[0]["bounding_box"] == [500, 300, 560, 340]
+
+
+@pytest.mark.usefixtures("clean_areas_data_fixture")
+def test_process_image_for_area_uses_tiled_mode_when_enabled():
+    import neopark_server
+
+    img_bytes = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(img_bytes, format="JPEG")
+    tiled_result = [
+        {"class": "car", "confidence": 0.93, "bounding_box": [1, 2, 30, 40]},
+        {"class": "car", "confidence": 0.42, "bounding_box": [5, 5, 9, 9]},
+    ]
+    with patch.object(neopark_server, "TILED_INFERENCE_AREAS", {"A1"}), patch(
+        "neopark_server.run_tiled_inference", return_value=tiled_result
+    ) as mock_tiled:
+        result = neopark_server.process_image_for_area("A1", img_bytes.getvalue())
+
+    mock_tiled.assert_called_once()
+    assert result["detections"] == [
+        {
+            "class": "car",
+            "confidence": 0.93,
+            "bounding_box": [1, 2, 30, 40],
+            "area": "A1",
+        }
+    ]
+
+
+class FakeMultiCarModel(FakeTileModel):
+    def __init__(self, cars):
+        super().__init__(car_box=None)
+        self.cars = cars
+
+    def _boxes_for(self, img):
+        boxes = []
+        for car_box, conf in self.cars:
+            self.car_box, self.conf = car_box, conf
+            boxes.extend(super()._boxes_for(img))
+        return boxes
+
+
+def test_run_tiled_inference_keeps_overlapping_cars_in_same_tile():
+    # Mobil belakang sebagian besar tertutup mobil depan: IoS tinggi, IoU rendah.
+    front, rear = (100, 100, 220, 180), (150, 110, 230, 175)
+    frame = TrackingImage(Image.new("RGB", (1280, 720)))
+    model = FakeMultiCarModel([(front, 0.9), (rear, 0.85)])
+    detections = run_tiled_inference(
+        model, frame, tile_size=640, overlap=0.5, batch_size=4
+    )
+    assert sorted(d["bounding_box"] for d in detections) == [list(front), list(rear)]
+    assert all(set(d) == {"class", "confidence", "bounding_box"} for d in detections)
+
+
+def test_run_tiled_inference_merges_car_cut_by_tile_border():
+    # Tile kiri hanya melihat potongan mobil yang melewati tepi x=640.
+    class CutModel(FakeTileModel):
+        def _boxes_for(self, img):
+            ox, _ = img.tile_origin
+            if img.size[0] == 640 and ox == 0:
+                return [FakeBox(0, 0.7, [600, 300, 640, 340])]
+            if ox <= 600 and ox + img.size[0] >= 700:
+                return [FakeBox(0, 0.9, [600 - ox, 300, 700 - ox, 340])]
+            return []
+
+    frame = TrackingImage(Image.new("RGB", (1280, 640)))
+    detections = run_tiled_inference(
+        CutModel(car_box=None), frame, tile_size=640, overlap=0.0, batch_size=4
+    )
+    assert [d["bounding_box"] for d in detections] == [[600, 300, 700, 340]]
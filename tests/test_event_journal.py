@@ -0,0 +1,209 @@
+# tests/test_event_journal.py
+import io
+import json
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from event_journal import EventJournal
+
+pytestmark = pytest.mark.usefixtures("clean_areas_data_fixture")
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = EventJournal(str(tmp_path / "events"), max_file_bytes=200)
+    yield journal
+    journal.stop()
+
+
+def _emit_and_flush(journal, count, area_id="A1"):
+    events = []
+    for new_count in range(count):
+        journal.emit("occupancy", area=area_id, old_count=0, new_count=new_count)
+        events.append(journal._queue.get_nowait())
+    for event in events:
+        journal.write_batch([event])
+    return events
+
+
+def test_read_after_resumes_across_rotated_files(journal):
+    _emit_and_flush(journal, 10)
+    assert len(journal.file_first_seqs()) > 1
+    assert [e["seq"] for e in journal.read_after(0)] == list(range(1, 11))
+    assert [e["seq"] for e in journal.read_after(6)] == [7, 8, 9, 10]
+    assert list(journal.read_after(10)) == []
+
+
+def test_retention_removes_oldest_files(tmp_path):
+    journal = EventJournal(str(tmp_path / "events"), max_file_bytes=1, max_files=2)
+    _emit_and_flush(journal, 5)
+    journal.stop()
+    assert journal.file_first_seqs() == [4, 5]
+    assert [e["seq"] for e in journal.read_after(0)] == [4, 5]
+
+
+def test_sequence_continues_after_restart(tmp_path):
+    journal = EventJournal(str(tmp_path / "events"))
+    _emit_and_flush(journal, 3)
+    journal.stop()
+    with open(journal._file_path(1), "a") as f:
+        f.write('{"seq":4,"ts"')  # baris terpotong saat crash
+
+    reopened = EventJournal(str(tmp_path / "events"))
+    assert reopened.flushed_seq == 3
+    assert reopened.emit("connection", area="A1", connected=False) == 4
+    assert open(journal._file_path(1)).read().endswith("}\n")
+
+
+def test_restarts_after_torn_only_file_keep_journal_readable(tmp_path):
+    directory = str(tmp_path / "events")
+    journal = EventJournal(directory, max_file_bytes=1)
+    _emit_and_flush(journal, 3)
+    journal.stop()
+    with open(journal._file_path(4), "w") as f:
+        f.write('{"seq":4,"ts"')  # file terbaru hanya berisi baris terpotong
+
+    for expected_seq in (4, 5):
+        restarted = EventJournal(directory, max_file_bytes=1)
+        assert restarted.flushed_seq == expected_seq - 1
+        _emit_and_flush(restarted, 1)
+        restarted.stop()
+        assert [e["seq"] for e in restarted.read_after(0)] == list(
+            range(1, expected_seq + 1)
+        )
+
+
+def test_read_after_stops_at_corrupt_line(journal):
+    _emit_and_flush(journal, 2)
+    with open(journal._file_path(1), "a") as f:
+        f.write("not json\n")
+    assert [e["seq"] for e in journal.read_after(0)] == [1, 2]
+
+
+def test_unflushed_events_are_not_visible(journal):
+    journal.emit("connection", area="A1", connected=True)
+    assert list(journal.read_after(0)) == []
+
+
+def test_background_writer_wakes_followers(journal):
+    stop = threading.Event()
+    received = []
+
+    def consume():
+        for event in journal.follow(0, poll_timeout=0.05, stop_event=stop):
+            received.append(event["seq"])
+            if len(received) == 3:
+                stop.set()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    journal.start()
+    for _ in range(3):
+        journal.emit("connection", area="A2", connected=True)
+    consumer.join(2.0)
+    assert not consumer.is_alive()
+    assert received == [1, 2, 3]
+
+
+def test_follow_yields_heartbeat_when_idle(journal):
+    _emit_and_flush(journal, 1)
+    events = journal.follow(0, poll_timeout=0.01, heartbeat_interval=0.05)
+    assert next(events)["seq"] == 1
+    assert next(events) is None
+    events.close()
+
+
+def test_follow_reads_only_appended_lines_across_rotation(journal):
+    _emit_and_flush(journal, 4)
+    decode = EventJournal._decode
+    with patch.object(EventJournal, "_decode", wraps=decode) as mock_decode:
+        events = journal.follow(0, poll_timeout=0.01)
+        assert [next(events)["seq"] for _ in range(4)] == [1, 2, 3, 4]
+        _emit_and_flush(journal, 6)
+        assert [next(events)["seq"] for _ in range(6)] == list(range(5, 11))
+        events.close()
+    assert len(journal.file_first_seqs()) > 2
+    assert mock_decode.call_count == 10
+
+
+def test_read_after_returns_early_when_caught_up(journal):
+    _emit_and_flush(journal, 2)
+    with patch.object(journal, "file_first_seqs") as mock_first_seqs:
+        assert list(journal.read_after(2)) == []
+    mock_first_seqs.assert_not_called()
+
+
+def test_event_lines_turn_heartbeat_into_blank_line():
+    from neopark_server import generate_event_lines
+
+    events = [{"seq": 1, "area": "A2"}, None, {"seq": 2, "area": "A1"}]
+    assert list(generate_event_lines(events, "A1")) == ["\n", '{"seq":2,"area":"A1"}\n']
+
+
+def _process(neopark_server, area_id, car_count):
+    img_bytes = io.BytesIO()
+    Image.new("RGB", (64, 48)).save(img_bytes, format="JPEG")
+    candidates = [
+        {"class": "car", "confidence": 0.95, "bounding_box": [i, i, i + 5, i + 5]}
+        for i in range(car_count)
+    ]
+    with patch("neopark_server.run_inference_for_area", return_value=candidates):
+        neopark_server.process_image_for_area(area_id, img_bytes.getvalue())
+
+
+def _journal_events(journal):
+    for event in list(journal._queue.queue):
+        journal.write_batch([event])
+    journal._queue.queue.clear()
+    return [
+        {k: v for k, v in e.items() if k not in ("seq", "ts")}
+        for e in journal.read_after(0)
+    ]
+
+
+def test_process_image_emits_changes_only(journal, clean_areas_data_fixture):
+    import neopark_server
+
+    with patch("neopark_server.event_journal", journal):
+        _process(neopark_server, "A1", 2)
+        _process(neopark_server, "A1", 2)
+        _process(neopark_server, "A1", 1)
+        clean_areas_data_fixture["A1"]["last_frame_time"] = datetime.now() - timedelta(
+            seconds=30
+        )
+        neopark_server.refresh_connection_status("A1")
+        neopark_server.refresh_connection_status("A1")
+
+    assert _journal_events(journal) == [
+        {"type": "connection", "area": "A1", "connected": True},
+        {"type": "occupancy", "area": "A1", "old_count": 0, "new_count": 2},
+        {"type": "occupancy", "area": "A1", "old_count": 2, "new_count": 1},
+        {"type": "connection", "area": "A1", "connected": False},
+    ]
+
+
+def test_events_endpoint_streams_ndjson_after_offset(client, journal):
+    for area_id in ("A1", "A2", "A1"):
+        journal.emit("connection", area=area_id, connected=True)
+    _journal_events(journal)
+
+    with patch("neopark_server.event_journal", journal):
+        response = client.get("/events?after=1&follow=0")
+        filtered = client.get("/events?follow=0&area=a1")
+        invalid = client.get("/events?after=abc")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["X-Journal-Last-Seq"] == "3"
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [e["seq"] for e in lines] == [2, 3]
+    assert [json.loads(line)["seq"] for line in filtered.data.splitlines()] == [1, 3]
+    assert invalid.status_code == 400
+
+
+def test_events_endpoint_disabled_without_journal(client):
+    assert client.get("/events").status_code == 404
@@ -0,0 +1,147 @@
+# tests/test_frame_archive.py
+import os
+from unittest.mock import patch
+
+import pytest
+
+from frame_archive import FrameArchive
+
+pytestmark = pytest.mark.usefixtures("clean_areas_data_fixture")
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = FrameArchive(str(tmp_path / "archive"), segment_seconds=10)
+    yield archive
+    archive.stop()
+
+
+def _write_frames(archive, area_id, timestamps):
+    archive.write_batch(
+        [
+            (area_id, ts, f"jpeg-{ts}".encode(), {"car_count": int(ts)})
+            for ts in timestamps
+        ]
+    )
+
+
+def test_write_batch_segments_by_time_and_reads_range(archive):
+    _write_frames(archive, "A1", [100.0, 105.0, 111.0, 125.0])
+    archive.stop()
+
+    assert archive.segments("A1") == [100, 110, 120]
+    frames = list(archive.iter_frames("A1", start=104.0, end=120.0))
+    assert [ts for ts, _, _ in frames] == [105.0, 111.0]
+    assert frames[0][1] == b"jpeg-105.0"
+    assert frames[1][2] == {"car_count": 111}
+
+
+def test_iter_frames_clamps_out_of_order_timestamps(archive):
+    _write_frames(archive, "A2", [200.0, 199.5, 201.0])
+    archive.stop()
+    assert [ts for ts, _, _ in archive.iter_frames("A2")] == [200.0, 200.0, 201.0]
+
+
+def test_restart_repairs_torn_index_before_appending(tmp_path):
+    from frame_archive import INDEX_RECORD
+
+    root = str(tmp_path / "archive")
+    archive = FrameArchive(root, segment_seconds=10)
+    _write_frames(archive, "A1", [100.0, 101.0])
+    archive.stop()
+    index_path = os.path.join(root, "A1", f"{100:012d}.idx")
+    with open(index_path, "ab") as f:
+        # Record yang datanya tidak pernah sampai ke .dat, lalu record terpotong.
+        f.write(INDEX_RECORD.pack(102.0, 10**6, 10, 10))
+        f.write(b"\x00" * 5)
+
+    assert [ts for ts, _, _ in archive.iter_frames("A1")] == [100.0, 101.0]
+
+    restarted = FrameArchive(root, segment_seconds=10)
+    _write_frames(restarted, "A1", [103.0])
+    restarted.stop()
+    assert os.path.getsize(index_path) == 3 * INDEX_RECORD.size
+    frames = list(restarted.iter_frames("A1"))
+    assert [(ts, img) for ts, img, _ in frames] == [
+        (100.0, b"jpeg-100.0"),
+        (101.0, b"jpeg-101.0"),
+        (103.0, b"jpeg-103.0"),
+    ]
+
+
+def test_iter_frames_closes_index_when_data_file_missing(archive):
+    _write_frames(archive, "A1", [100.0])
+    archive.stop()
+    os.remove(os.path.join(archive.root, "A1", f"{100:012d}.dat"))
+    with patch("frame_archive._SegmentIndex.close") as mock_close:
+        assert list(archive.iter_frames("A1")) == []
+    mock_close.assert_called_once()
+
+
+def test_enforce_retention_by_age_and_size(tmp_path):
+    archive = FrameArchive(
+        str(tmp_path / "archive"), segment_seconds=10, max_age_seconds=30
+    )
+    _write_frames(archive, "A1", [100.0, 110.0, 120.0, 130.0])
+    archive.stop()
+
+    archive.enforce_retention(now=165.0)
+    assert archive.segments("A1") == [130]
+
+    archive.max_bytes = 0
+    archive.enforce_retention(now=165.0)
+    assert archive.segments("A1") == []
+
+
+def test_append_never_blocks_when_queue_full(tmp_path):
+    archive = FrameArchive(str(tmp_path / "archive"), queue_size=1)
+    assert archive.append("A1", 1.0, b"a", {}) is True
+    assert archive.append("A1", 2.0, b"b", {}) is False
+
+
+def test_background_writer_flushes_appended_frames(archive):
+    archive.start()
+    archive.append("A1", 50.0, b"jpeg", {"detections": []})
+    archive.stop()
+    assert os.path.isdir(os.path.join(archive.root, "A1"))
+    assert [img for _, img, _ in archive.iter_frames("A1")] == [b"jpeg"]
+
+
+def test_replay_endpoint_streams_archived_frames(client, archive):
+    _write_frames(archive, "A1", [100.0, 101.0])
+    archive.stop()
+    with patch("neopark_server.frame_archive", archive):
+        response = client.get("/replay/a1?start=100&end=101&speed=max")
+        assert response.status_code == 200
+        assert response.mimetype == "multipart/x-mixed-replace"
+        body = response.get_data()
+    assert body.count(b"--frame") == 2
+    assert b"jpeg-101.0" in body
+
+
+@pytest.mark.parametrize("speed", ["0", "-2", "nan", "inf", "fast"])
+def test_replay_endpoint_rejects_invalid_speed(client, archive, speed):
+    with patch("neopark_server.frame_archive", archive):
+        response = client.get(f"/replay/a1?speed={speed}")
+    assert response.status_code == 400
+
+
+def test_replay_paces_frames_unless_speed_is_max(archive):
+    from neopark_server import generate_replay_frames
+
+    _write_frames(archive, "A1", [100.0, 100.5])
+    archive.stop()
+    with patch("neopark_server.frame_archive", archive), patch(
+        "neopark_server.time.sleep"
+    ) as mock_sleep:
+        list(generate_replay_frames("A1", None, None, 2.0))
+        mock_sleep.assert_called_once_with(0.25)
+        mock_sleep.reset_mock()
+        list(generate_replay_frames("A1", None, None, float("inf")))
+        mock_sleep.assert_not_called()
+
+
+def test_replay_endpoint_disabled_without_archive(client):
+    with patch("neopark_server.frame_archive", None):
+        response = client.get("/replay/a1")
+    assert response.status_code == 404
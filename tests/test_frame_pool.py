@@ -0,0 +1,97 @@
+# tests/test_frame_pool.py
+import io
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from frame_pool import FramePool
+from renditions import RenditionCache
+
+pytestmark = pytest.mark.usefixtures("clean_areas_data_fixture")
+
+
+def test_put_shares_buffer_and_replaces_previous_frame():
+    pool = FramePool(budget_bytes=1000)
+    frame = b"x" * 100
+    assert pool.put("A1", "latest_frame", frame) is frame
+    pool.put("A1", "latest_frame", b"y" * 40)
+    pool.put("A1", "processed_frame", memoryview(b"z" * 10))
+    assert pool.stats()["used_bytes"] == 50
+    assert pool.stats()["buffers"] == 2
+
+
+def test_evicts_least_recently_used_idle_area_over_budget():
+    evicted = []
+    pool = FramePool(budget_bytes=250, on_evict=lambda a, b: evicted.append((a, b)))
+    pool.put("A1", "latest_frame", b"1" * 100)
+    pool.put("A2", "latest_frame", b"2" * 100)
+    pool.touch("A1")
+    pool.put("A3", "latest_frame", b"3" * 100)
+    assert evicted == [("A2", {"latest_frame": b"2" * 100})]
+    assert pool.stats()["used_bytes"] == 200
+
+
+def test_pinned_areas_are_never_evicted():
+    evicted = []
+    pool = FramePool(budget_bytes=150, on_evict=lambda a, b: evicted.append(a))
+    pool.put("A1", "latest_frame", b"1" * 100)
+    with pool.pin("A1"):
+        pool.put("A2", "latest_frame", b"2" * 100)
+        assert evicted == []
+        assert pool.stats()["pinned_areas"] == ["A1"]
+    pool.put("A2", "processed_frame", b"2" * 10)
+    assert evicted == ["A1"]
+
+
+def test_rendition_cache_data_counts_towards_budget():
+    pool = FramePool(budget_bytes=10**6)
+    cache = RenditionCache(pool=pool)
+    with cache.subscribe("A1", "latest_frame", "thumbnail"), patch(
+        "renditions.encode_rendition", return_value=b"t" * 30
+    ):
+        cache.get("A1", "latest_frame", "thumbnail", 1, b"frame")
+        assert pool.stats()["used_bytes"] == 30
+    assert pool.stats()["used_bytes"] == 0
+
+
+def test_process_image_stores_one_shared_buffer(clean_areas_data_fixture):
+    import neopark_server
+
+    img_bytes = io.BytesIO()
+    Image.new("RGB", (64, 48)).save(img_bytes, format="JPEG")
+    frame = img_bytes.getvalue()
+    pool = FramePool(budget_bytes=10**6)
+    with patch("neopark_server.frame_pool", pool), patch(
+        "neopark_server.run_inference_for_area", return_value=[]
+    ):
+        neopark_server.process_image_for_area("A1", frame)
+
+    area_data = clean_areas_data_fixture["A1"]
+    assert area_data["latest_frame"] is frame
+    assert pool.stats()["used_bytes"] == len(frame) + len(area_data["processed_frame"])
+
+
+def test_eviction_resets_idle_area_to_placeholder(clean_areas_data_fixture):
+    import neopark_server
+
+    clean_areas_data_fixture["A2"]["latest_frame"] = b"a2-frame"
+    neopark_server.evict_area_frames("A2", {"latest_frame": b"other"})
+    assert clean_areas_data_fixture["A2"]["latest_frame"] == b"a2-frame"
+    neopark_server.evict_area_frames(
+        "A2", {"latest_frame": clean_areas_data_fixture["A2"]["latest_frame"]}
+    )
+    assert clean_areas_data_fixture["A2"]["latest_frame"] is None
+
+
+def test_feed_yields_shared_frame_object_without_copying(clean_areas_data_fixture):
+    from neopark_server import FRAME_HEADER, FRAME_TRAILER, generate_frames_for_area
+
+    frame = b"processed-jpeg"
+    clean_areas_data_fixture["A1"]["processed_frame"] = frame
+    with patch("neopark_server.time.sleep"):
+        frames = generate_frames_for_area("A1")
+        chunks = [next(frames) for _ in range(3)]
+        frames.close()
+    assert chunks[0] is FRAME_HEADER and chunks[2] is FRAME_TRAILER
+    assert chunks[1] is frame
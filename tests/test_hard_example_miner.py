@@ -0,0 +1,89 @@
+# tests/test_hard_example_miner.py
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from hard_example_miner import HardExampleMiner, yolo_label_lines
+
+
+def _car(conf, box):
+    return {"class": "car", "confidence": conf, "bounding_box": box}
+
+
+@pytest.fixture
+def miner(tmp_path):
+    miner = HardExampleMiner(str(tmp_path / "hard"), band=(0.4, 0.8), count_change=3)
+    yield miner
+    miner.stop()
+
+
+def test_yolo_label_lines_normalizes_and_clips():
+    lines = yolo_label_lines([_car(0.9, [-10, 0, 50, 50])], 100, 200)
+    assert lines == ["0 0.250000 0.125000 0.500000 0.250000"]
+
+
+def test_reasons_borderline_count_change_and_track_disagreement(miner):
+    steady = [_car(0.9, [0, 0, 10, 10]), _car(0.95, [20, 0, 30, 10])]
+    assert miner.reasons_for("A1", steady) == []
+    assert miner.reasons_for("A1", steady + [_car(0.6, [40, 0, 50, 10])]) == [
+        "borderline"
+    ]
+    moved = [_car(0.9, [100, 100, 110, 110]), _car(0.95, [20, 0, 30, 10])]
+    assert miner.reasons_for("A1", moved) == ["track_disagreement"]
+    assert miner.reasons_for("A1", []) == ["track_disagreement"]
+    crowd = [_car(0.9, [i * 20, 0, i * 20 + 10, 10]) for i in range(4)]
+    assert miner.reasons_for("A1", crowd) == ["count_change"]
+
+
+def test_consider_is_rate_limited(tmp_path):
+    miner = HardExampleMiner(str(tmp_path / "hard"), max_per_minute=2)
+    borderline = [_car(0.5, [0, 0, 10, 10])]
+    results = [miner.consider("A2", b"jpeg", borderline, (64, 64)) for _ in range(4)]
+    assert results == [["borderline"], ["borderline"], None, None]
+
+
+def test_writer_exports_yolo_dataset(miner):
+    miner.start()
+    miner.consider(
+        "A1",
+        b"jpeg-bytes",
+        [_car(0.5, [0, 0, 32, 32]), _car(0.2, [40, 40, 50, 50])],
+        (64, 64),
+        timestamp=1700000000.0,
+    )
+    miner.stop()
+
+    manifest = [
+        json.loads(line) for line in open(f"{miner.output_dir}/manifest.ndjson")
+    ]
+    assert len(manifest) == 1
+    entry = manifest[0]
+    assert entry["reasons"] == ["borderline"]
+    base = f"{miner.output_dir}/{entry['split']}"
+    assert open(f"{base}/images/{entry['name']}.jpg", "rb").read() == b"jpeg-bytes"
+    assert open(f"{base}/labels/{entry['name']}.txt").read() == (
+        "0 0.250000 0.250000 0.500000 0.500000\n"
+    )
+    dataset_yaml = open(f"{miner.output_dir}/vehicle.yaml").read()
+    assert "train: train/images" in dataset_yaml
+    assert "val: val/images" in dataset_yaml
+    assert 'names: ["car"]' in dataset_yaml
+
+
+@pytest.mark.usefixtures("clean_areas_data_fixture")
+def test_process_image_for_area_feeds_hard_example_miner(miner):
+    import neopark_server
+
+    img_bytes = io.BytesIO()
+    Image.new("RGB", (64, 48)).save(img_bytes, format="JPEG")
+    candidates = [_car(0.55, [1, 2, 30, 40])]
+    with patch("neopark_server.hard_example_miner", miner), patch(
+        "neopark_server.run_inference_for_area", return_value=candidates
+    ), patch.object(miner, "consider") as mock_consider:
+        neopark_server.process_image_for_area("A2", img_bytes.getvalue())
+
+    args = mock_consider.call_args[0]
+    assert args[:4] == ("A2", img_bytes.getvalue(), candidates, (64, 48))
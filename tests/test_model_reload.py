@@ -0,0 +1,154 @@
+# tests/test_model_reload.py
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import neopark_server
+from shadow_model import ShadowEvaluator
+
+AUTH = {"Authorization": "Bearer secret"}
+
+
+@pytest.fixture(autouse=True)
+def admin_token():
+    with patch("neopark_server.ADMIN_TOKEN", "secret"):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def restore_model_globals():
+    saved_instance = neopark_server._model_instance
+    saved_state = dict(neopark_server.model_state)
+    yield
+    neopark_server.stop_shadow_model()
+    neopark_server._model_instance = saved_instance
+    neopark_server.model_state.clear()
+    neopark_server.model_state.update(saved_state)
+
+
+def test_reload_swaps_model_without_touching_in_flight_reference():
+    old_model = MagicMock(name="old")
+    new_model = MagicMock(name="new")
+    neopark_server._model_instance = old_model
+    in_flight = neopark_server._model_instance
+
+    with patch("neopark_server.load_yolo_model", return_value=new_model):
+        assert neopark_server.reload_yolo_model("candidate.pt") is True
+
+    assert neopark_server._model_instance is new_model
+    assert in_flight is old_model
+    assert neopark_server.model_state["path"] == "candidate.pt"
+    assert neopark_server.model_state["reload_status"] == "idle"
+
+
+def test_failed_reload_keeps_serving_old_model():
+    old_model = MagicMock(name="old")
+    neopark_server._model_instance = old_model
+    with patch("neopark_server.load_yolo_model", side_effect=IOError("corrupt")):
+        assert neopark_server.reload_yolo_model("broken.pt") is False
+    assert neopark_server._model_instance is old_model
+    assert neopark_server.model_state["reload_status"] == "failed"
+    assert "corrupt" in neopark_server.model_state["last_error"]
+
+
+def test_admin_reload_endpoint_validates_path(client, tmp_path):
+    with patch("neopark_server.MODELS_DIR", str(tmp_path)):
+        response = client.post(
+            "/admin/reload_model", json={"path": "missing.pt"}, headers=AUTH
+        )
+        assert response.status_code == 400
+
+        model_file = tmp_path / "fine-best.pt"
+        model_file.write_bytes(b"weights")
+        with patch("neopark_server.reload_yolo_model") as mock_reload:
+            response = client.post(
+                "/admin/reload_model", json={"path": "fine-best.pt"}, headers=AUTH
+            )
+            assert response.status_code == 202
+    mock_reload.assert_called_once_with(str(model_file))
+
+
+@pytest.mark.parametrize("route", ["/admin/reload_model", "/admin/shadow_model"])
+def test_admin_rejects_model_paths_outside_models_dir(client, tmp_path, route):
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    outside = tmp_path / "evil.pt"
+    outside.write_bytes(b"pickle")
+    (models_dir / "link.pt").symlink_to(outside)
+    with patch("neopark_server.MODELS_DIR", str(models_dir)), patch(
+        "neopark_server.load_yolo_model"
+    ) as mock_load:
+        for path in (str(outside), "../evil.pt", "link.pt"):
+            response = client.post(route, json={"path": path}, headers=AUTH)
+            assert response.status_code == 400
+            assert "must be inside" in response.json["error"]
+    mock_load.assert_not_called()
+
+
+def test_admin_endpoints_require_token(client):
+    assert client.get("/admin/model").status_code == 401
+    assert (
+        client.get("/admin/model", headers={"Authorization": "Bearer x"}).status_code
+        == 401
+    )
+    response = client.get("/admin/model", headers=AUTH)
+    assert response.status_code == 200
+    assert response.json["shadow"]["status"] == "disabled"
+
+
+def test_admin_endpoints_disabled_without_token(client):
+    with patch("neopark_server.ADMIN_TOKEN", None), patch(
+        "neopark_server.reload_yolo_model"
+    ) as mock_reload:
+        assert client.get("/admin/model").status_code == 403
+        response = client.post("/admin/reload_model", headers=AUTH)
+        assert response.status_code == 403
+        assert client.post("/admin/shadow_model/promote").status_code == 403
+    mock_reload.assert_not_called()
+
+
+def test_shadow_evaluator_counts_disagreements():
+    counts = iter([2, 3])
+    shadow = ShadowEvaluator(
+        MagicMock(), "candidate.pt", lambda area, model, img: next(counts), 1.0
+    )
+    assert shadow.evaluate("A1", object(), primary_count=2) == 2
+    assert shadow.evaluate("A1", object(), primary_count=2) == 3
+    assert shadow.stats == {"frames": 2, "disagreements": 1, "skipped": 0}
+
+
+def test_shadow_submit_respects_sample_rate_and_queue_bound():
+    shadow = ShadowEvaluator(MagicMock(), "c.pt", MagicMock(), 0.0, queue_size=1)
+    assert shadow.submit("A1", object(), 1) is False
+    shadow.sample_rate = 1.0
+    assert shadow.submit("A1", object(), 1) is True
+    assert shadow.submit("A1", object(), 1) is False
+    assert shadow.stats["skipped"] == 1
+
+
+def test_promote_shadow_model_swaps_primary(client):
+    candidate = MagicMock(name="candidate")
+    with patch("neopark_server.load_yolo_model", return_value=candidate):
+        neopark_server.start_shadow_model("candidate.pt", 0.5)
+    status = client.get("/admin/model", headers=AUTH).json
+    assert status["shadow"]["status"] == "running"
+
+    response = client.post("/admin/shadow_model/promote", headers=AUTH)
+    assert response.status_code == 200
+    assert neopark_server._model_instance is candidate
+    assert neopark_server.model_state["path"] == "candidate.pt"
+    assert neopark_server.shadow_evaluator is None
+    assert client.post("/admin/shadow_model/promote", headers=AUTH).status_code == 409
+
+
+def test_promote_refuses_while_reload_in_progress(client):
+    candidate = MagicMock(name="candidate")
+    with patch("neopark_server.load_yolo_model", return_value=candidate):
+        neopark_server.start_shadow_model("candidate.pt", 0.5)
+    primary = neopark_server._model_instance
+
+    with neopark_server._model_reload_lock:
+        response = client.post("/admin/shadow_model/promote", headers=AUTH)
+    assert response.status_code == 409
+    assert neopark_server._model_instance is primary
+    assert neopark_server.shadow_evaluator is not None
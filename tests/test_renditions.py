@@ -0,0 +1,70 @@
+# tests/test_renditions.py
+import io
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from renditions import RenditionCache, encode_rendition
+
+pytestmark = pytest.mark.usefixtures("clean_areas_data_fixture")
+
+
+def _jpeg(size=(1280, 720), color="white"):
+    output = io.BytesIO()
+    Image.new("RGB", size, color=color).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def test_encode_rendition_fits_bounds_and_keeps_aspect():
+    img = Image.open(io.BytesIO(encode_rendition(_jpeg(), "thumbnail")))
+    assert img.format == "JPEG"
+    assert img.size == (320, 180)
+
+
+def test_cache_encodes_once_per_frame_version_for_all_subscribers():
+    cache = RenditionCache()
+    frame = _jpeg()
+    with cache.subscribe("A1", "latest_frame", "medium"), cache.subscribe(
+        "A1", "latest_frame", "medium"
+    ), patch("renditions.encode_rendition", return_value=b"medium") as mock_encode:
+        assert cache.get("A1", "latest_frame", "medium", 1, frame) == b"medium"
+        assert cache.get("A1", "latest_frame", "medium", 1, frame) == b"medium"
+        assert mock_encode.call_count == 1
+        cache.get("A1", "latest_frame", "medium", 2, frame)
+        assert mock_encode.call_count == 2
+        assert cache.active_renditions() == {("A1", "latest_frame", "medium"): 2}
+    assert cache.active_renditions() == {}
+
+
+def test_full_rendition_is_passed_through_without_encoding():
+    cache = RenditionCache()
+    frame = _jpeg()
+    with patch("renditions.encode_rendition") as mock_encode:
+        assert cache.get("A1", "latest_frame", "full", 1, frame) is frame
+    mock_encode.assert_not_called()
+
+
+def test_raw_feed_generator_streams_thumbnail(clean_areas_data_fixture):
+    from neopark_server import generate_raw_frames_for_area, rendition_cache
+
+    clean_areas_data_fixture["A1"]["latest_frame"] = _jpeg()
+    clean_areas_data_fixture["A1"]["latest_frame_version"] += 1
+    with patch("neopark_server.time.sleep"):
+        frames = generate_raw_frames_for_area("A1", "thumbnail", 2.0)
+        header, frame, trailer = next(frames), next(frames), next(frames)
+        assert rendition_cache.active_renditions() == {
+            ("A1", "latest_frame", "thumbnail"): 1
+        }
+        frames.close()
+    assert rendition_cache.active_renditions() == {}
+
+    assert header == b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+    assert trailer == b"\r\n"
+    img = Image.open(io.BytesIO(frame))
+    assert img.size == (320, 180)
+
+
+@pytest.mark.parametrize("query", ["size=huge", "fps=0", "fps=abc"])
+def test_feed_rejects_invalid_rendition_parameters(client, query):
+    assert client.get(f"/a1/video_feed?{query}").status_code == 400
@@ -0,0 +1,141 @@
+# tests/test_rescore_frames.py
+import csv
+import json
+import multiprocessing
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from frame_archive import FrameArchive
+from rescore_frames import (
+    compare_detections,
+    iter_archive_records,
+    iter_directory_records,
+    rescore,
+)
+
+
+class FakeBox:
+    def __init__(self, conf, xyxy):
+        self.cls = np.array([0])
+        self.conf = np.array([conf])
+        self.xyxy = np.array([xyxy], dtype=float)
+
+
+class FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class FakeModel:
+    # Jumlah mobil = nilai piksel merah di pojok kiri atas frame (BGR).
+    names = {0: "car"}
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, frames, **kwargs):
+        self.batch_sizes.append(len(frames))
+        return [
+            FakeResult(
+                [
+                    FakeBox(0.9, [i * 10, 0, i * 10 + 8, 8])
+                    for i in range(frame[0, 0, 2] // 50)
+                ]
+                + [FakeBox(0.3, [0, 20, 8, 28])]
+            )
+            for frame in frames
+        ]
+
+
+def _save_frame(path, cars):
+    Image.new("RGB", (32, 32), color=(cars * 50, 0, 0)).save(
+        path, format="JPEG", quality=100
+    )
+
+
+@pytest.fixture
+def frames_dir(tmp_path):
+    root = tmp_path / "frames"
+    for area_id, counts in {"a1": [1, 2, 3], "a2": [0, 1]}.items():
+        (root / area_id).mkdir(parents=True)
+        for i, cars in enumerate(counts):
+            _save_frame(root / area_id / f"{i:03d}.jpg", cars)
+    stored = {"detections": [{"bounding_box": [0, 0, 8, 8]}]}
+    (root / "a1" / "001.json").write_text(json.dumps(stored))
+    return root
+
+
+def test_compare_detections_counts_added_and_missing():
+    new = [{"bounding_box": [0, 0, 10, 10]}, {"bounding_box": [50, 50, 60, 60]}]
+    stored = [{"bounding_box": [1, 1, 10, 10]}, {"bounding_box": [90, 90, 99, 99]}]
+    assert compare_detections(new, stored) == {"matched": 1, "added": 1, "missing": 1}
+
+
+def test_rescore_directory_writes_timelines_diffs_and_stats(frames_dir, tmp_path):
+    out_dir = tmp_path / "out"
+    model = FakeModel()
+    stats = rescore(
+        iter_directory_records(str(frames_dir)),
+        model,
+        str(out_dir),
+        batch_size=2,
+        max_in_flight=2,
+    )
+
+    assert stats["frames"] == 5
+    assert stats["areas"]["A1"]["frames"] == 3
+    assert stats["areas"]["A1"]["mean_car_count"] == 2
+    assert max(model.batch_sizes) == 2
+
+    with open(out_dir / "timeline_A1.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["car_count"] for row in rows] == ["1", "2", "3"]
+    assert rows[1]["stored_car_count"] == "1"
+
+    diffs = [json.loads(line) for line in open(out_dir / "diffs.ndjson")]
+    assert diffs == [
+        {
+            "area": "A1",
+            "timestamp": diffs[0]["timestamp"],
+            "source": str(frames_dir / "a1" / "001.jpg"),
+            "car_count": 2,
+            "stored_car_count": 1,
+            "matched": 1,
+            "added": 1,
+            "missing": 0,
+        }
+    ]
+    assert json.load(open(out_dir / "stats.json"))["frames"] == 5
+
+
+def test_rescore_archive_with_decoder_pool(tmp_path):
+    archive = FrameArchive(str(tmp_path / "archive"))
+    for ts, cars in [(10.0, 1), (11.0, 3)]:
+        path = tmp_path / f"{ts}.jpg"
+        _save_frame(path, cars)
+        archive.write_batch([("A1", ts, path.read_bytes(), {"detections": []})])
+    archive.stop()
+
+    with multiprocessing.Pool(2) as pool:
+        stats = rescore(
+            iter_archive_records(archive.root),
+            FakeModel(),
+            str(tmp_path / "out"),
+            pool=pool,
+        )
+    assert stats["frames"] == 2
+    assert stats["areas"]["A1"]["diff_frames"] == 2
+
+
+def test_rescore_skips_undecodable_frames(tmp_path):
+    (tmp_path / "frames" / "a1").mkdir(parents=True)
+    (tmp_path / "frames" / "a1" / "broken.jpg").write_bytes(b"not a jpeg")
+    stats = rescore(
+        iter_directory_records(str(tmp_path / "frames")),
+        FakeModel(),
+        str(tmp_path / "out"),
+    )
+    assert stats["frames"] == 0
+    assert stats["decode_errors"] == 1
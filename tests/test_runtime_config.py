@@ -0,0 +1,183 @@
+# tests/test_runtime_config.py
+import json
+from unittest.mock import patch
+
+import pytest
+
+from runtime_config import apply_runtime_config, load_runtime_config
+from tune_runtime import (
+    build_runtime_config,
+    candidate_configs,
+    run_candidate,
+    select_config,
+    process_cpu_affinity,
+)
+
+
+def _write_config(tmp_path, **values):
+    path = tmp_path / "runtime_config.json"
+    path.write_text(json.dumps(values))
+    return str(path)
+
+
+def test_load_runtime_config_keeps_known_keys(tmp_path):
+    path = _write_config(
+        tmp_path,
+        torch_threads=2,
+        workers=3,
+        imgsz=480,
+        batch_size=None,
+        cpu_affinity=[3, 2],
+        measured={"throughput_fps": 12.5},
+    )
+    assert load_runtime_config(path) == {
+        "torch_threads": 2,
+        "workers": 3,
+        "imgsz": 480,
+        "cpu_affinity": [2, 3],
+    }
+
+
+def test_load_runtime_config_rejects_non_positive_values(tmp_path):
+    with pytest.raises(ValueError):
+        load_runtime_config(_write_config(tmp_path, workers=0))
+
+
+def test_apply_runtime_config_sets_threads_and_affinity():
+    with patch("torch.set_num_threads") as mock_threads, patch(
+        "torch.set_num_interop_threads", side_effect=RuntimeError("already set")
+    ), patch("runtime_config.os.sched_setaffinity", create=True) as mock_affinity:
+        settings = apply_runtime_config(
+            {"torch_threads": 2, "interop_threads": 1, "cpu_affinity": [0]}
+        )
+    mock_threads.assert_called_once_with(2)
+    mock_affinity.assert_called_once_with(0, [0])
+    assert {"torch_threads", "interop_threads", "cpu_affinity"} <= set(settings)
+
+
+def test_process_cpu_affinity_pins_whole_process():
+    cpus = list(range(8))
+    assert process_cpu_affinity(cpus, 2, 3, "process") == [0, 1, 2, 3, 4, 5]
+    assert process_cpu_affinity(cpus, 3, 3, "process") is None
+    assert process_cpu_affinity(cpus, 3, 3, "none") is None
+
+
+def test_candidate_configs_skips_combinations_that_do_not_fit():
+    candidates = list(
+        candidate_configs([1, 4], [2], ["none", "process"], [1], [640], [0, 1, 2, 3])
+    )
+    assert [(c["torch_threads"], c["pinning"]) for c in candidates] == [
+        (1, "none"),
+        (1, "process"),
+        (4, "none"),
+    ]
+
+
+def _result(threads, workers, fps, p99, cpu_affinity=None, batch_size=None):
+    return {
+        "torch_threads": threads,
+        "workers": workers,
+        "pinning": "process" if cpu_affinity else "none",
+        "batch_size": batch_size,
+        "imgsz": 640,
+        "cpu_affinity": cpu_affinity,
+        "throughput_fps": fps,
+        "latency_ms_p50": p99 / 2,
+        "latency_ms_p99": p99,
+    }
+
+
+def test_select_config_maximises_throughput_within_slo():
+    results = [
+        _result(4, 1, 10.0, 150.0),
+        _result(1, 4, 30.0, 400.0),
+        _result(2, 2, 20.0, 250.0, cpu_affinity=[0, 1, 2, 3]),
+    ]
+    best = select_config(results, slo_ms=300)
+    assert (best["torch_threads"], best["workers"], best["meets_slo"]) == (2, 2, True)
+
+    config = build_runtime_config(best, "fine-best.pt", 300, interop=1)
+    assert config["cpu_affinity"] == [0, 1, 2, 3]
+    assert config["measured"]["throughput_fps"] == 20.0
+    assert "batch_size" not in config
+
+    fallback = select_config(results, slo_ms=100)
+    assert fallback["latency_ms_p99"] == 150.0 and not fallback["meets_slo"]
+
+
+def test_tiled_tuning_writes_tile_batch_size():
+    best = select_config([_result(2, 1, 5.0, 100.0, batch_size=4)], slo_ms=300)
+    assert build_runtime_config(best, "fine-best.pt", 300, 1)["batch_size"] == 4
+
+
+class _RecordingModel:
+    names = {0: "car"}
+
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+
+    def __call__(self, imgs, **kwargs):
+        self.calls.append((imgs if isinstance(imgs, list) else [imgs], kwargs))
+        return [type("Result", (), {"boxes": None})()] * len(self.calls[-1][0])
+
+
+@pytest.mark.parametrize(
+    "tile_options, batch_size, expected_batch",
+    [(None, None, 1), ({"tile_size": 32, "overlap": 0.0}, 2, 2)],
+)
+def test_run_candidate_measures_one_upload_per_request(
+    tmp_path, tile_options, batch_size, expected_batch
+):
+    from PIL import Image
+
+    image_path = tmp_path / "frame.jpg"
+    Image.new("RGB", (64, 32)).save(image_path)
+    model = _RecordingModel()
+    candidate = {
+        "torch_threads": 1,
+        "workers": 2,
+        "pinning": "none",
+        "batch_size": batch_size,
+        "imgsz": 320,
+        "cpu_affinity": None,
+    }
+    with patch("ultralytics.YOLO", return_value=model), patch(
+        "torch.set_num_threads"
+    ), patch("torch.set_num_interop_threads"):
+        result = run_candidate(
+            candidate, "m.pt", [str(image_path)], 3, 0, 1, tile_options
+        )
+
+    assert result["frames"] == 6
+    assert max(len(imgs) for imgs, _ in model.calls) == expected_batch
+    assert all(kwargs["imgsz"] == 320 for _, kwargs in model.calls)
+
+
+def test_run_candidate_pins_process_like_server_startup(tmp_path):
+    from PIL import Image
+
+    image_path = tmp_path / "frame.jpg"
+    Image.new("RGB", (64, 32)).save(image_path)
+    candidate = {
+        "torch_threads": 2,
+        "workers": 1,
+        "pinning": "process",
+        "batch_size": None,
+        "imgsz": 320,
+        "cpu_affinity": [0, 1],
+    }
+    with patch("ultralytics.YOLO", return_value=_RecordingModel()), patch(
+        "tune_runtime.apply_runtime_config"
+    ) as mock_apply:
+        run_candidate(candidate, "m.pt", [str(image_path)], 1, 0, 1)
+    mock_apply.assert_called_once_with(
+        {"torch_threads": 2, "interop_threads": 1, "cpu_affinity": [0, 1]}
+    )
+
+
+def test_custom_metrics_exposes_resolved_runtime_settings(client):
+    response = client.get("/custom_metrics")
+    settings = response.get_json()["runtime_settings"]
+    assert {"torch_threads", "workers", "batch_size", "imgsz", "cpu_affinity"} <= set(
+        settings
+    )
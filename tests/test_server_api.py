@@ -161,7 +161,7 @@ def test_video_feed_area(
     mock_generate_frames, client, area_id_param, clean_areas_data_fixture
 ):
     # Buat mock generator mengembalikan frame sederhana
-    def dummy_frame_generator(area_id_gen):
+    def dummy_frame_generator(area_id_gen, rendition, max_fps):
         yield (
             b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + b"dummyjpegdata" + b"\r\n"
         )
@@ -174,4 +174,4 @@ def test_video_feed_area(
     assert response.status_code == 200
     assert response.mimetype == "multipart/x-mixed-replace"
 
-    mock_generate_frames.assert_called_once_with(area_id_param)
+    mock_generate_frames.assert_called_once_with(area_id_param, "full", None)
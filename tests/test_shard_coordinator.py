@@ -0,0 +1,178 @@
+# tests/test_shard_coordinator.py
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+from flask import Flask, Response, jsonify, request
+from prometheus_client import CollectorRegistry
+from werkzeug.serving import make_server
+
+from shard_coordinator import (
+    HashRing,
+    ShardRouter,
+    create_coordinator_app,
+    parse_area_map,
+    parse_shards,
+)
+
+
+def _fake_shard(name, car_counts, delay=0.0):
+    # Node inference palsu yang meniru endpoint neopark_server.
+    app = Flask(name)
+
+    def area_payload(area_id):
+        return {
+            "car_count": car_counts.get(area_id, 0),
+            "detections": [],
+            "connection_status": area_id in car_counts,
+        }
+
+    @app.route("/combined/get_detections")
+    def combined_detections():
+        time.sleep(delay)
+        return jsonify({f"area_{a.lower()}": area_payload(a) for a in ("A1", "A2")})
+
+    @app.route("/combined/status")
+    def combined_status():
+        time.sleep(delay)
+        return jsonify(
+            {
+                f"area_{a.lower()}": {"connection_status": a in car_counts}
+                for a in ("A1", "A2")
+            }
+        )
+
+    @app.route("/<area>/upload", methods=["POST"])
+    def upload(area):
+        return jsonify(
+            {"shard": name, "area": area.upper(), "bytes": len(request.data)}
+        )
+
+    @app.route("/<area>/video_feed")
+    def video_feed(area):
+        def frames():
+            while True:
+                yield b"--frame\r\n"
+                time.sleep(0.01)
+
+        return Response(frames(), mimetype="multipart/x-mixed-replace")
+
+    return app
+
+
+@pytest.fixture
+def shard_servers():
+    servers = {}
+
+    def start(name, car_counts, delay=0.0):
+        server = make_server(
+            "127.0.0.1", 0, _fake_shard(name, car_counts, delay), threaded=True
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[name] = server
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers.values():
+        server.shutdown()
+
+
+def _coordinator(shards, static_map, timeout=1.0):
+    router = ShardRouter(shards, ["A1", "A2"], static_map=static_map, timeout=timeout)
+    app = create_coordinator_app(router, registry=CollectorRegistry())
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def test_parse_shards_and_area_map():
+    assert parse_shards("n1=http://h1:5000/, http://h2:5000") == {
+        "n1": "http://h1:5000",
+        "shard2": "http://h2:5000",
+    }
+    assert parse_area_map("a1=n1, A2 = n2") == {"A1": "n1", "A2": "n2"}
+
+
+def test_hash_ring_moves_few_areas_when_node_added():
+    areas = [f"A{i}" for i in range(200)]
+    before = HashRing(["n1", "n2", "n3"])
+    after = HashRing(["n1", "n2", "n3", "n4"])
+    moved = [a for a in areas if before.node_for(a) != after.node_for(a)]
+    assert all(after.node_for(a) == "n4" for a in moved)
+    assert len(moved) < len(areas) / 2
+
+
+def test_combined_detections_fan_out_takes_each_area_from_owner(shard_servers):
+    shards = {
+        "n1": shard_servers("n1", {"A1": 3}),
+        "n2": shard_servers("n2", {"A2": 2}),
+    }
+    client = _coordinator(shards, {"A1": "n1", "A2": "n2"})
+    data = client.get("/combined/get_detections").json
+    assert data["total_cars"] == 5
+    assert data["area_a1"]["car_count"] == 3
+    assert data["area_a2"]["car_count"] == 2
+    assert data["partial"] is False
+
+    status = client.get("/combined/status").json
+    assert status["area_a1"]["connection_status"] is True
+    assert status["area_a2"]["connection_status"] is True
+
+
+def test_combined_returns_partial_result_when_shard_is_slow(shard_servers):
+    shards = {
+        "n1": shard_servers("n1", {"A1": 4}),
+        "n2": shard_servers("n2", {"A2": 1}, delay=1.0),
+    }
+    client = _coordinator(shards, {"A1": "n1", "A2": "n2"}, timeout=0.2)
+    started = time.perf_counter()
+    data = client.get("/combined/get_detections").json
+    assert time.perf_counter() - started < 1.0
+    assert data["total_cars"] == 4
+    assert data["partial"] is True
+    assert data["missing_areas"] == ["A2"]
+    assert "n2" in data["shard_errors"]
+
+
+def test_upload_is_routed_to_owning_shard(shard_servers):
+    shards = {"n1": shard_servers("n1", {}), "n2": shard_servers("n2", {})}
+    client = _coordinator(shards, {"A2": "n1"})
+    response = client.post("/a2/upload", data=b"jpeg-bytes")
+    assert response.status_code == 200
+    assert response.json == {"shard": "n1", "area": "A2", "bytes": 10}
+    assert client.post("/a9/upload", data=b"x").status_code == 404
+
+
+def test_streaming_proxy_closes_upstream_when_client_disconnects(shard_servers):
+    client = _coordinator({"n1": shard_servers("n1", {})}, {"A1": "n1"})
+    with patch.object(
+        requests.Response, "close", autospec=True, side_effect=requests.Response.close
+    ) as mock_close:
+        response = client.get("/a1/video_feed", buffered=False)
+        assert next(response.response).startswith(b"--frame")
+        response.close()
+    assert mock_close.call_count == 1
+
+
+def test_concurrent_fan_outs_do_not_time_out_healthy_shards(shard_servers):
+    shards = {
+        "node1": shard_servers("node1", {"A1": 1}, delay=0.3),
+        "node2": shard_servers("node2", {"A2": 2}, delay=0.3),
+    }
+    router = ShardRouter(
+        shards, ["A1", "A2"], static_map={"A1": "node1", "A2": "node2"}, timeout=1.0
+    )
+    outcomes = []
+
+    def poll():
+        outcomes.append(router.fan_out("/combined/get_detections"))
+
+    pollers = [threading.Thread(target=poll) for _ in range(12)]
+    for thread in pollers:
+        thread.start()
+    for thread in pollers:
+        thread.join(10)
+    assert len(outcomes) == 12
+    assert all(set(results) == {"node1", "node2"} for results, _ in outcomes)
+    assert all(errors == {} for _, errors in outcomes)
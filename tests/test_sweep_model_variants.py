@@ -0,0 +1,76 @@
+# tests/test_sweep_model_variants.py
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../FineTune-YOLOv8"))
+)
+
+from sweep_model_variants import (  # noqa: E402
+    export_variant,
+    rank_variants,
+    write_report,
+)
+
+
+def _result(size, precision, map50, p50):
+    return {
+        "size": size,
+        "imgsz": 416,
+        "precision": precision,
+        "model_path": f"yolov8{size}_{precision}",
+        "map50": map50,
+        "map50_95": map50 - 0.2,
+        "latency_ms_mean": p50,
+        "latency_ms_p50": p50,
+        "latency_ms_p99": p50 * 2,
+    }
+
+
+def test_rank_variants_prefers_fastest_variant_meeting_bar():
+    results = [
+        _result("m", "fp32", 0.95, 300.0),
+        _result("n", "int8", 0.80, 20.0),
+        _result("s", "int8", 0.90, 60.0),
+        _result("n", "fp32", 0.84, 45.0),
+    ]
+    ranked = rank_variants(results, "map50", 0.85)
+    assert [(r["size"], r["precision"]) for r in ranked] == [
+        ("s", "int8"),
+        ("m", "fp32"),
+        ("n", "fp32"),
+        ("n", "int8"),
+    ]
+    assert [r["meets_accuracy_bar"] for r in ranked] == [True, True, False, False]
+
+
+def test_write_report_points_server_at_best_variant(tmp_path):
+    ranked = rank_variants([_result("s", "int8", 0.9, 60.0)], "map50", 0.85)
+    best = write_report(ranked, tmp_path, "map50", 0.85)
+    assert best["model_path"] == "yolov8s_int8"
+    report = (tmp_path / "sweep_report.md").read_text()
+    assert "NEOPARK_MODEL_PATH=yolov8s_int8" in report
+    assert "NEOPARK_MODEL_IMGSZ=416" in report
+    assert "batch dinamis" in report
+
+
+def test_export_variant_uses_dynamic_batch_for_int8(tmp_path):
+    exported = tmp_path / "best_int8_openvino_model"
+    exported.mkdir()
+    with patch("sweep_model_variants.YOLO") as mock_yolo:
+        mock_yolo.return_value.export.return_value = str(exported)
+        target = export_variant(str(tmp_path / "best.pt"), 416, "int8", "calib.yaml")
+    kwargs = mock_yolo.return_value.export.call_args.kwargs
+    assert kwargs["dynamic"] is True and kwargs["int8"] is True
+    assert target.endswith("best_416_int8_openvino_model")
+
+
+def test_server_passes_configured_imgsz_to_model():
+    import neopark_server
+
+    model = neopark_server.get_yolo_model()
+    model.reset_mock()
+    with patch.object(neopark_server, "MODEL_PREDICT_KWARGS", {"imgsz": 416}):
+        neopark_server.run_inference_for_area("A2", model, object())
+    assert model.call_args.kwargs == {"imgsz": 416}